@@ -10,9 +10,25 @@ let g:nvim_typescript#javascript_support =
 let g:nvim_typescript#vue_support =
       \ get(g:, 'nvim_typescript#vue_support', 0)
 let g:nvim_typescript#server_path =
-      \ get(g:, 'nvim_typescript#_server_path', 'node_modules/.bin/tsserver')
+      \ get(g:, 'nvim_typescript#server_path', 'node_modules/.bin/tsserver')
+let g:nvim_typescript#max_old_space_size =
+      \ get(g:, 'nvim_typescript#max_old_space_size', 3072)
+let g:nvim_typescript#standby_server =
+      \ get(g:, 'nvim_typescript#standby_server', 0)
+let g:nvim_typescript#max_servers =
+      \ get(g:, 'nvim_typescript#max_servers', 4)
 let g:nvim_typescript#max_completion_detail =
       \ get(g:, 'nvim_typescript#max_completion_detail', 25)
+let g:nvim_typescript#lazy_completion_detail =
+      \ get(g:, 'nvim_typescript#lazy_completion_detail', 0)
+let g:nvim_typescript#diagnostics_enable =
+      \ get(g:, 'nvim_typescript#diagnostics_enable', 0)
+let g:nvim_typescript#diagnostics_delay =
+      \ get(g:, 'nvim_typescript#diagnostics_delay', 500)
+let g:nvim_typescript#symbol_index =
+      \ get(g:, 'nvim_typescript#symbol_index', 0)
+let g:nvim_typescript#close_hidden_after =
+      \ get(g:, 'nvim_typescript#close_hidden_after', 0)
 let g:nvim_typescript#type_info_on_hold =
       \ get(g:, 'nvim_typescript#type_info_on_hold', 0)
 let g:nvim_typescript#signature_complete =
@@ -58,6 +74,11 @@ let s:kind_symbols = {
 let g:nvim_typescript#kind_symbols =
       \ get(g:, 'nvim_typescript#kind_symbols', s:kind_symbols)
 
+" The remote plugin keeps a snapshot of the settings, refresh it on change
+if exists('*dictwatcheradd')
+  call dictwatcheradd(g:, 'nvim_typescript#*', 'TSOnConfigChanged')
+endif
+
 
 augroup nvim-typescript "{{{
   autocmd!
@@ -78,6 +99,11 @@ augroup nvim-typescript "{{{
     autocmd CursorHold *.ts,*.tsx TSType
   endif
 
+  if get(g:, 'nvim_typescript#lazy_completion_detail', 0) && has('nvim-0.4')
+    autocmd CompleteChanged *.ts,*.tsx,*.js,*.jsx,*.vue call TSOnCompleteChanged(v:event)
+    autocmd CompleteDone,InsertLeave *.ts,*.tsx,*.js,*.jsx,*.vue call TSOnCompleteChanged({})
+  endif
+
   if get(g:, 'nvim_typescript#signature_complete', 1)
      autocmd CompleteDone *.ts,*.tsx TSSig
   endif
@@ -86,15 +112,18 @@ augroup nvim-typescript "{{{
     autocmd BufEnter *.js,*.jsx call nvim_typescript#DefaultKeyMap()
     autocmd BufEnter *.js,*.jsx call TSOnBufEnter()
     autocmd BufWritePost *.js,*.jsx call TSOnBufSave()
+    autocmd BufUnload *.js,*.jsx call TSOnBufUnload(expand('<afile>:p'), expand('<abuf>'))
   endif
   if get(g:, 'nvim_typescript#vue_support', 1)
     autocmd BufEnter *.vue call nvim_typescript#DefaultKeyMap()
     autocmd BufEnter *.vue call TSOnBufEnter()
     autocmd BufWritePost *.vue call TSOnBufSave()
+    autocmd BufUnload *.vue call TSOnBufUnload(expand('<afile>:p'), expand('<abuf>'))
   endif
   autocmd BufEnter *.ts,*.tsx call nvim_typescript#DefaultKeyMap()
   autocmd BufEnter *.ts,*.tsx call TSOnBufEnter()
   autocmd BufWritePost *.ts,*.tsx call TSOnBufSave()
+  autocmd BufUnload *.ts,*.tsx call TSOnBufUnload(expand('<afile>:p'), expand('<abuf>'))
 
   autocmd User CmSetup call cm#sources#typescript#register()
 
@@ -8,6 +8,7 @@ let s:ts = yarp#py3('nvim_typescript_wrap')
 com -nargs=* TSStop call call(s:ts.request, ['TSStop'] + [<f-args>], s:ts)
 com -nargs=* TSStart call call(s:ts.request, ['TSStart'] + [<f-args>], s:ts)
 com -nargs=* TSRestart call call(s:ts.request, ['TSRestart'] + [<f-args>], s:ts)
+com -nargs=* TSReloadConfig call call(s:ts.request, ['TSReloadConfig'] + [<f-args>], s:ts)
 com -nargs=* TSReloadProject call call(s:ts.request, ['TSReloadProject'] + [<f-args>], s:ts)
 com -nargs=* TSDoc call call(s:ts.request, ['TSDoc'] + [<f-args>], s:ts)
 com -nargs=* TSDef call call(s:ts.request, ['TSDef'] + [<f-args>], s:ts)
@@ -15,6 +16,8 @@ com -nargs=* TSDefPreview call call(s:ts.request, ['TSDefPreview'] + [<f-args>],
 com -nargs=* TSType call call(s:ts.request, ['TSType'] + [<f-args>], s:ts)
 com -nargs=* TSTypeDef call call(s:ts.request, ['TSTypeDef'] + [<f-args>], s:ts)
 com -nargs=* TSGetErr call call(s:ts.request, ['TSGetErr'] + [<f-args>], s:ts)
+com -nargs=* TSProjectErr call call(s:ts.request, ['TSProjectErr'] + [<f-args>], s:ts)
+com -nargs=* TSProjectErrCancel call call(s:ts.request, ['TSProjectErrCancel'] + [<f-args>], s:ts)
 com -nargs=* TSSyncErr call call(s:ts.request, ['TSSyncErr'] + [<f-args>], s:ts)
 com -nargs=* TSRename call call(s:ts.request, ['TSRename'] + [<f-args>], s:ts)
 com -nargs=* TSImport call call(s:ts.request, ['TSImport'] + [<f-args>], s:ts)
@@ -46,6 +49,9 @@ endfunc
 func! TSOnBufSave(...)
     return call(s:ts.request, ['TSOnBufSave'] + a:000, s:ts)
 endfunc
+func! TSOnBufUnload(...)
+    return call(s:ts.request, ['TSOnBufUnload'] + a:000, s:ts)
+endfunc
 func! TSCmRefresh(...)
     return call(s:ts.request, ['TSCmRefresh'] + a:000, s:ts)
 endfunc
@@ -53,6 +59,7 @@ endfunc
 " @neovim.command("TSStop")
 " @neovim.command("TSStart")
 " @neovim.command("TSRestart")
+" @neovim.command("TSReloadConfig")
 " @neovim.command("TSReloadProject")
 " @neovim.command("TSDoc")
 " @neovim.command("TSDef")
@@ -60,6 +67,8 @@ endfunc
 " @neovim.command("TSType")
 " @neovim.command("TSTypeDef")
 " @neovim.command("TSGetErr")
+" @neovim.command("TSProjectErr")
+" @neovim.command("TSProjectErrCancel")
 " @neovim.command("TSSyncErr")
 " @neovim.command("TSRename", nargs="*")
 " @neovim.command("TSImport")
@@ -75,5 +84,6 @@ endfunc
 " @neovim.function('TSGetServerPath', sync=True)
 " @neovim.function('TSOnBufEnter')
 " @neovim.function('TSOnBufSave')
+" @neovim.function('TSOnBufUnload')
 " @neovim.function('TSCmRefresh', sync=False)
 
@@ -12,6 +12,8 @@ def TSStart(*args):
     return _obj.tsstart()
 def TSRestart(*args):
     return _obj.tsrestart()
+def TSReloadConfig(*args):
+    return _obj.reloadConfig()
 def TSReloadProject(*args):
     return _obj.reloadProject()
 def TSDoc(*args):
@@ -26,6 +28,10 @@ def TSTypeDef(*args):
     return _obj.tstypedef()
 def TSGetErr(*args):
     return _obj.tsgeterr()
+def TSProjectErr(*args):
+    return _obj.tsprojecterr()
+def TSProjectErrCancel(*args):
+    return _obj.tsprojecterrcancel()
 def TSSyncErr(*args):
     return _obj.tssyncerr(args)
 def TSRename(*args):
@@ -57,5 +63,7 @@ def TSOnBufEnter(*args):
     return _obj.on_bufenter(args)
 def TSOnBufSave(*args):
     return _obj.on_bufwritepost(args)
+def TSOnBufUnload(*args):
+    return _obj.on_bufunload(args)
 def TSCmRefresh(*args):
     return _obj.on_cm_refresh(args)
@@ -15,7 +15,7 @@ class Source(Base):
     def __init__(self, vim):
         super().__init__(vim)
         self.vim = vim
-        self._client = Client()
+        self._client = Client.instance()
         self.name = 'TSDocumentSymbol'
         self.kind = 'file'
 
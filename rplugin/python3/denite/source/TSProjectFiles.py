@@ -16,7 +16,7 @@ class Source(Base):
     def __init__(self, vim):
         super().__init__(vim)
         self.vim = vim
-        self._client = Client()
+        self._client = Client.instance()
         self.name = 'TSProjectFiles'
         self.kind = 'file'
 
@@ -28,7 +28,7 @@ class Source(Base):
     def gather_candidates(self, context):
         cwd = os.getcwd()
         bufname = self.vim.current.buffer.name
-        responce = self._client.projectInfo(bufname)
+        responce = self._client.projectInfo(bufname, True)
         if responce is None:
             return []
         candidates = self.convertToCandidate(responce['fileNames'])
@@ -1,5 +1,4 @@
 from .base import Base
-from operator import itemgetter
 import re
 import sys
 import os
@@ -7,7 +6,12 @@ import os
 sys.path.insert(1, os.path.dirname(__file__) + '/../../nvim-typescript')
 
 from client import Client
-from utils import getKind
+from fuzzy import FuzzyIndex
+from symbol_index import SymbolIndex
+from utils import getKind, getSetting
+
+# symbols asked to tsserver for the input, see Source.seed
+SEED_RESULT_COUNT = 1000
 
 
 class Source(Base):
@@ -15,14 +19,48 @@ class Source(Base):
     def __init__(self, vim):
         super().__init__(vim)
         self.vim = vim
-        self._client = Client()
+        self._client = Client.instance()
         self.name = 'TSWorkspaceSymbol'
         self.kind = 'file'
 
     def on_init(self, context):
+        """
+        Search the symbol index when there is one, it keeps its fuzzy
+        index up to date as files are saved. Otherwise a fuzzy index is
+        seeded from navto as the input starts.
+        """
         context['__bufname'] = self.vim.current.buffer.name
         context['is_interactive'] = True
         context['is_async'] = False
+        context['__index'] = FuzzyIndex()
+        context['__search'] = context['__index'].search
+        context['__seeded'] = set()
+        if getSetting(self.vim, 'symbol_index'):
+            index = SymbolIndex.for_root(
+                self._client.project_root_for(context['__bufname']))
+            if index.ready():
+                context['__search'] = index.fuzzy_search
+                context['__seeded'] = None
+
+    def seed(self, context, query):
+        """
+        Ask tsserver for the symbols matching the input, the following
+        keystrokes are matched locally. When the answer was cut at
+        SEED_RESULT_COUNT symbols, the longer input is asked again.
+        """
+        seeded = context['__seeded']
+        if seeded is None or not query:
+            return
+        key = query.lower()
+        # a complete answer for a prefix of the input holds all its matches
+        if any(key.startswith(prefix) for prefix in seeded):
+            return
+        res = self._client.getWorkspaceSymbols(
+            context['__bufname'], key, SEED_RESULT_COUNT, 'denite')
+        if res:
+            context['__index'].add(res)
+        if not res or len(res) < SEED_RESULT_COUNT:
+            seeded.add(key)
 
     def convertToCandidate(self, symbols):
         cwd = os.getcwd()
@@ -35,19 +73,13 @@ class Source(Base):
         }, symbols))
 
     def gather_candidates(self, context):
-        res = self._client.getWorkspaceSymbols(
-            context['__bufname'], context['input'])
-        if res is None:
-            return []
-        else:
-            candidates = self.convertToCandidate(res)
-            if candidates:
-                values = list(map(lambda symbol: {
-                    'abbr': " {0}\t{1}\t{2}".format(symbol['kindIcon'], symbol['text'], symbol['file']),
-                    'word': symbol['text'],
-                    'action__line': symbol['lnum'],
-                    "action__path": symbol['file'],
-                    "action__col": symbol['col'],
-                }, candidates))
-                return sorted(values, key=itemgetter('action__line'))
-            return []
+        self.seed(context, context['input'])
+        candidates = self.convertToCandidate(
+            context['__search'](context['input']))
+        return list(map(lambda symbol: {
+            'abbr': " {0}\t{1}\t{2}".format(symbol['kindIcon'], symbol['text'], symbol['file']),
+            'word': symbol['text'],
+            'action__line': symbol['lnum'],
+            "action__path": symbol['file'],
+            "action__col": symbol['col'],
+        }, candidates))
@@ -5,16 +5,18 @@ import platform
 import itertools
 
 from time import time
-from tempfile import NamedTemporaryFile
 from deoplete.source.base import Base
 from deoplete.util import error
 sys.path.insert(1, os.path.dirname(__file__) + '/../../nvim-typescript')
 
-from utils import getKind, convert_completion_data, convert_detailed_completion_data
+from utils import getSetting, iter_completion_response
 from client import Client
+from buffer_sync import BufferSync
+from completion_cache import CompletionCache, DetailCache
 
 RELOAD_INTERVAL = 1
-RESPONSE_TIMEOUT_SECONDS = 20
+# candidates handed to deoplete per gather_candidates call
+CANDIDATES_CHUNK_SIZE = 500
 
 
 class Source(Base):
@@ -34,12 +36,14 @@ class Source(Base):
         self.input_pattern = r'.'
         # self.input_pattern = r'(\.|::)\w*'
         self._last_input_reload = time()
-        self._max_completion_detail = self.vim.vars[
-            "nvim_typescript#max_completion_detail"]
 
         # TSServer client
         # self._client = Client(debug_fn=self.debug, log_fn=self.log)
-        self._client = Client()
+        self._client = Client.instance()
+        self._sync = BufferSync(self._client)
+        self._cache = CompletionCache()
+        self._details = DetailCache()
+        self._stream = None
 
     def log(self, message):
         """
@@ -51,18 +55,19 @@ class Source(Base):
 
     def reload(self):
         """
-        send a reload request
+        send a reload request, unless the buffer changes are already
+        streamed to the server
         """
+        buffer = self.vim.current.buffer
+        if self._sync.is_synced(buffer.number):
+            return
+        changedtick = self.vim.eval('b:changedtick')
+        if self._sync.is_synced(buffer.number, changedtick):
+            return
         filename = self.relative_file()
         contents = self.vim.eval("join(getline(1,'$'), \"\n\")")
 
-        tmpfile = NamedTemporaryFile(delete=False)
-        tmpfile.write(contents.encode("utf-8"))
-        tmpfile.close()
-
-        self._client.reload(filename, tmpfile.name)
-
-        os.unlink(tmpfile.name)
+        self._sync.reload(filename, contents, buffer.number, changedtick)
 
     def relative_file(self):
         """
@@ -70,6 +75,46 @@ class Source(Base):
         """
         return self.vim.current.buffer.name
 
+    def completions(self, context):
+        """
+        completions at the start of the current word, served from the
+        session cache while the word is being typed. Any other change to
+        the file moves its version and ends the session.
+        """
+        position = context["complete_position"]
+        file = self.relative_file()
+        key = (file, self._sync.version(file), context["position"][1],
+               position, context["input"][:position])
+        prefix = context["complete_str"]
+
+        data = self._cache.get(key, prefix)
+        if data is None:
+            # reload if last reload expired or input completion is a method extraction
+            # pylint: disable=locally-disabled, line-too-long
+            if time() - self._last_input_reload > RELOAD_INTERVAL or re.search(r"\w*\.", context["input"]):
+                self._last_input_reload = time()
+                self.reload()
+            data = self._client.completions(
+                file=self.relative_file(),
+                line=context["position"][1],
+                offset=position + 1,
+                prefix=prefix,
+                origin='deoplete'
+            )
+            if data:
+                self._cache.put(key, prefix, data)
+        return data
+
+    def stream(self, context, items):
+        """
+        Return the next chunk of converted candidates, asking deoplete to
+        come back for the rest while there are more
+        """
+        chunk = list(itertools.islice(items, CANDIDATES_CHUNK_SIZE))
+        context["is_async"] = len(chunk) == CANDIDATES_CHUNK_SIZE
+        self._stream = items if context["is_async"] else None
+        return chunk
+
     def get_complete_position(self, context):
         """
         returns the cursor position
@@ -82,50 +127,50 @@ class Source(Base):
         Main deoplete method
         returns completions from client.py
         """
-        # reload if last reload expired or input completion is a method extraction
-        # pylint: disable=locally-disabled, line-too-long
-
         try:
-            if time() - self._last_input_reload > RELOAD_INTERVAL or re.search(r"\w*\.", context["input"]):
-                self._last_input_reload = time()
-                self.reload()
+            if context.get("is_async") and self._stream is not None:
+                return self.stream(context, self._stream)
 
-            data = self._client.completions(
-                file=self.relative_file(),
-                line=context["position"][1],
-                offset=context["complete_position"] + 1,
-                prefix=context["complete_str"]
-            )
+            data = self.completions(context)
             # self.log(data)
             if len(data) == 0:
                 return []
 
-            if len(data) > self._max_completion_detail:
-                filtered = []
-                for entry in data:
-                    if entry["kind"] != "warning":
-                        filtered.append(entry)
-                return [convert_completion_data(e, self.vim) for e in filtered]
-
-            names = []
-            maxNameLength = 0
-
-            for entry in data:
-                if entry["kind"] != "warning":
-                    names.append(entry["name"])
-                    maxNameLength = max(maxNameLength, len(entry["name"]))
-
-            detailed_data = self._client.completion_entry_details(
-                file=self.relative_file(),
-                line=context["position"][1],
-                offset=context["complete_position"] + 1,
-                entry_names=names
+            entries = [e for e in data if e["kind"] != "warning"]
+            file = self.relative_file()
+
+            max_completion_detail = getSetting(
+                self.vim, "max_completion_detail")
+
+            if getSetting(self.vim, "lazy_completion_detail"):
+                # Details are resolved in the background and shown for the
+                # selected item by TSOnCompleteChanged
+                self._details.remember(
+                    file, context["position"][1],
+                    context["complete_position"] + 1, entries,
+                    self._client.generation())
+                self._details.prefetch(self._client, max_completion_detail)
+                return self.stream(
+                    context, iter_completion_response(entries, self.vim))
+
+            if len(data) > max_completion_detail:
+                return self.stream(
+                    context, iter_completion_response(entries, self.vim))
+
+            detailed_data = self._details.details(
+                self._client,
+                file,
+                context["position"][1],
+                context["complete_position"] + 1,
+                entries,
+                self._client.generation()
             )
 
             if len(detailed_data) == 0:
                 return []
 
-            return [convert_detailed_completion_data(e, self.vim, isDeoplete=True) for e in detailed_data]
+            return self.stream(context, iter_completion_response(
+                detailed_data, self.vim, detailed=True, isDeoplete=True))
         except:
         #     e = sys.exc_info()[0]
         #     error(self.vim, "<p>Error: %s</p>" % e)
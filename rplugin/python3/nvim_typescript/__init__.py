@@ -2,12 +2,17 @@ import sys
 import os
 import re
 import json
+import threading
 import neovim
 from time import time
-from tempfile import NamedTemporaryFile
 sys.path.insert(1, os.path.dirname(__file__))
 from client import Client
+from buffer_sync import BufferSync, OpenFiles
+from completion_cache import DetailCache
 import utils
+import diagnostics
+import rename
+from symbol_index import SymbolIndex, merge_dependencies
 RELOAD_INTERVAL = 1
 
 @neovim.plugin
@@ -15,10 +20,27 @@ class TypescriptHost(object):
 
     def __init__(self, vim):
         self.vim = vim
-        self._client = Client(debug_fn=self.log, log_fn=self.log)
+        self._client = Client.instance(debug_fn=self.log, log_fn=self.log)
+        self._sync = BufferSync(self._client)
+        self._client.on_server_start(self._sync.resync)
+        self._client.schedule_with(self.vim.async_call)
+        self._details = DetailCache()
+        self._detail_window = None
         self._last_input_reload = time()
         self.cwd = os.getcwd()
         self.highlight_source = 0
+        # bufnr -> (b:changedtick, highlights applied by reportErrors)
+        self._highlights = {}
+        # whether nvim_call_atomic is available, known after its first call
+        self._atomic = None
+        self._diagnostics = diagnostics.DiagnosticsService(
+            vim, self._client, self.visible_files, self.on_diagnostics)
+        self._project_errors = None
+        self._sync_errors = diagnostics.DiagnosticsCache()
+        # project roots indexed during this session
+        self._indexed = set()
+        self._open_files = OpenFiles()
+        self._close_timer = None
 
     def relative_file(self):
         """
@@ -39,18 +61,44 @@ class TypescriptHost(object):
     def reload(self):
         """
         Call tsserver.reload()
+        Attached buffers are already up to date through their change events,
+        others are only sent again when b:changedtick moved.
         """
+        buffer = self.vim.current.buffer
+        if self._sync.is_synced(buffer.number):
+            return
+        changedtick = self.vim.eval('b:changedtick')
+        if self._sync.is_synced(buffer.number, changedtick):
+            return
         filename = self.relative_file()
         contents = self.vim.eval("join(getline(1,'$'), \"\n\")")
-        tmpfile = NamedTemporaryFile(delete=False)
-        tmpfile.write(contents.encode("utf-8"))
-        tmpfile.close()
-
         try:
-            self._client.reload(filename, tmpfile.name)
+            self._sync.reload(filename, contents, buffer.number, changedtick)
         except:
             pass
-        os.unlink(tmpfile.name)
+
+    def attach(self):
+        """
+        Follow the current buffer changes, if neovim supports it
+        """
+        buffer = self.vim.current.buffer
+        if buffer.name:
+            self._sync.attach(self.vim, buffer)
+
+    @neovim.rpc_export('nvim_buf_lines_event')
+    def on_buf_lines(self, buf, changedtick, firstline, lastline, linedata, more):
+        self._sync.on_lines(buf.number, changedtick,
+                            firstline, lastline, linedata)
+        self._sync_errors.clear()
+        self.schedule_diagnostics()
+
+    @neovim.rpc_export('nvim_buf_changedtick_event')
+    def on_buf_changedtick(self, buf, changedtick):
+        self._sync.on_changedtick(buf.number, changedtick)
+
+    @neovim.rpc_export('nvim_buf_detach_event')
+    def on_buf_detach(self, buf):
+        self._sync.detach(buf.number)
 
     @neovim.command("TSStop")
     def tsstop(self):
@@ -58,6 +106,7 @@ class TypescriptHost(object):
         Stop the client
         """
         if self._client.server_handle is not None:
+            self._client.stop()
             self.printMsg('Server Stopped')
 
     @neovim.command("TSStart")
@@ -66,10 +115,10 @@ class TypescriptHost(object):
         Stat the client
         """
         if self._client.server_handle is None:
-            self._client.serverPath = self.vim.vars[
-                "nvim_typescript#server_path"]
+            self._client.configure(utils.getSettings(self.vim))
             if self._client.start():
-                self._client.open(self.relative_file())
+                self.open_buffers()
+                self.attach()
                 self.printMsg('Server Started')
 
     @neovim.command("TSRestart")
@@ -77,10 +126,22 @@ class TypescriptHost(object):
         """
             Restart the Client
         """
-        self.tsstop()
-        self.tsstart()
+        if self._client.server_handle is None:
+            self.tsstart()
+        else:
+            self._client.restart()
+            self.printMsg('Server Restarted')
 
-        # self._client.open(self.relative_file())
+    @neovim.command("TSReloadConfig")
+    def reloadConfig(self):
+        """
+        Read the g:nvim_typescript#* settings again
+        """
+        utils.getSettings(self.vim, reload=True)
+
+    @neovim.function("TSOnConfigChanged")
+    def on_config_changed(self, args=None):
+        utils.getSettings(self.vim, reload=True)
 
     @neovim.command("TSReloadProject")
     def reloadProject(self):
@@ -96,7 +157,7 @@ class TypescriptHost(object):
             file = self.vim.current.buffer.name
             line = self.vim.current.window.cursor[0]
             offset = self.vim.current.window.cursor[1] + 2
-            info = self._client.getDoc(file, line, offset)
+            info = self._client.getDoc(file, line, offset, 'TSDoc')
 
             if info:
                 displayString = '{0}'.format(info['displayString'])
@@ -181,7 +242,7 @@ class TypescriptHost(object):
             file = self.vim.current.buffer.name
             line = self.vim.current.window.cursor[0]
             offset = self.vim.current.window.cursor[1] + 2
-            info = self._client.getDoc(file, line, offset)
+            info = self._client.getDoc(file, line, offset, 'TSType')
             if info:
                 message = '{0}'.format(info['displayString'])
                 message = re.sub("\s+", " ", message)
@@ -206,28 +267,147 @@ class TypescriptHost(object):
             self.printError('Server is not running')
 
     def reportErrors(self, errors):
-        self.vim.call('setloclist', 0, errors, 'r', 'Errors')
+        """
+        Fill the location list and highlight the errors of the current
+        buffer in a single atomic call. Highlights already applied are
+        kept, unless the buffer changed since.
+        """
         buf = self.vim.current.buffer
         bufname = buf.name
         if (self.highlight_source == 0):
             self.highlight_source = self.vim.new_highlight_source()
-        buf.clear_highlight(self.highlight_source)
-        for e in errors:
-            if e['filename'] == bufname:
-                # highlight to end of line if the error goes past the line
-                end = e['end']['offset'] - \
-                    1 if e['end']['line'] == e['lnum'] else -1
-                buf.add_highlight(
-                    'ERROR',  # highlight group
-                    # annoyingly this command is 0-indexed unlike the location
-                    # list
-                    e['lnum'] - 1,
-                    # annoyingly this command is 0-indexed unlike the location
-                    # list
-                    e['col'] - 1,
-                    end,
-                    src_id=self.highlight_source
-                )
+        changedtick = self.vim.eval('b:changedtick')
+        previous = self._highlights.get(buf.number)
+        if previous is not None and previous[0] != changedtick:
+            previous = None
+        current = diagnostics.highlights_for(errors, bufname)
+        calls = [['nvim_call_function',
+                  ['setloclist', [0, errors, 'r', 'Errors']]]]
+        calls.extend(diagnostics.highlight_calls(
+            buf, self.highlight_source,
+            previous[1] if previous else None, current))
+        self.call_atomic(calls)
+        self._highlights[buf.number] = (changedtick, current)
+
+    def call_atomic(self, calls):
+        """
+        Run the calls with nvim_call_atomic, one by one when it isn't
+        available (vim, older neovim). Returns their results, raises
+        NvimError when one of them fails.
+        """
+        if self._atomic is not False:
+            try:
+                results, error = self.vim.api.call_atomic(calls)
+                self._atomic = True
+            except AttributeError:
+                self._atomic = False
+            except neovim.api.NvimError as failure:
+                # an older neovim without the API
+                if self._atomic or 'Invalid method' not in str(failure):
+                    raise
+                self._atomic = False
+        if not self._atomic:
+            return [self.vim.request(method, *args) for method, args in calls]
+        if error is not None:
+            index, kind, message = error
+            raise neovim.api.NvimError('{0} failed: {1}'.format(
+                calls[index][0], message))
+        return results
+
+    def open_buffers(self):
+        """
+        Open the current buffer in tsserver with its content, if it isn't
+        already. The buffers hidden for longer than
+        g:nvim_typescript#close_hidden_after are closed in the same request.
+        """
+        buffer = self.vim.current.buffer
+        file = self.relative_file()
+        contents = None
+        if buffer.name == file and not self._client.is_open(file):
+            changedtick, lines = self.call_atomic([
+                ('nvim_buf_get_var', [buffer, 'changedtick']),
+                ('nvim_buf_get_lines', [buffer, 0, -1, False])])
+            contents = '\n'.join(lines)
+        opened, closed = self._client.update_open(
+            {file: contents}, self.hidden_files())
+        if file in opened and contents is not None:
+            self._sync.opened(file, buffer.number, changedtick)
+        self.schedule_close_hidden()
+
+    def hidden_files(self):
+        """
+        The open files not shown in any window, nor modified, for
+        g:nvim_typescript#close_hidden_after seconds
+        """
+        timeout = utils.getSetting(self.vim, "close_hidden_after", 0)
+        if not timeout:
+            return []
+        visible = self.vim.eval(
+            "map(filter(getbufinfo(), "
+            "'!empty(v:val.windows) || v:val.changed'), 'v:val.name')")
+        return self._open_files.hidden(
+            self._client.open_files(), visible, timeout)
+
+    def schedule_close_hidden(self):
+        """
+        Look for hidden buffers to close once the timeout has passed, in
+        case no other buffer is entered until then
+        """
+        timeout = utils.getSetting(self.vim, "close_hidden_after", 0)
+        if self._close_timer is not None:
+            self._close_timer.cancel()
+        if not timeout:
+            return
+        self._close_timer = threading.Timer(
+            timeout + 1, self.vim.async_call, [self.close_hidden])
+        self._close_timer.daemon = True
+        self._close_timer.start()
+
+    def close_hidden(self):
+        self._client.update_open(closed=self.hidden_files())
+
+    def schedule_diagnostics(self):
+        """
+        Check the visible files once the changes settle, when
+        g:nvim_typescript#diagnostics_enable is set
+        """
+        if not utils.getSetting(self.vim, "diagnostics_enable"):
+            return
+        self._diagnostics.delay = utils.getSetting(
+            self.vim, "diagnostics_delay", 500) / 1000.0
+        self._diagnostics.schedule()
+
+    def visible_files(self):
+        """
+        The files shown in the current tab that tsserver knows about
+        """
+        files = self.vim.eval(
+            "map(tabpagebuflist(), 'fnamemodify(bufname(v:val), \":p\")')")
+        opened = self._client.open_files()
+        return sorted(set(f for f in files if f in opened))
+
+    def on_diagnostics(self, file, errors):
+        """
+        Background diagnostics came in, only the current buffer is reported
+        the others are shown when entered
+        """
+        if file == self.vim.current.buffer.name:
+            self.reportErrors(diagnostics.loclist_items(file, errors))
+
+    def symbol_index(self, file):
+        """
+        The SymbolIndex of the project of file, when
+        g:nvim_typescript#symbol_index is set. The first use in a session
+        brings it up to date in the background.
+        """
+        if not file or not utils.getSetting(self.vim, "symbol_index"):
+            return None
+        root = self._client.project_root_for(file)
+        index = SymbolIndex.for_root(root)
+        if root not in self._indexed:
+            self._indexed.add(root)
+            index.build(self._client, file)
+        return index
 
     @neovim.command("TSGetErr")
     def tsgeterr(self):
@@ -253,33 +433,78 @@ class TypescriptHost(object):
         else:
             self.printError('Server is not Running')
 
+    @neovim.command("TSProjectErr")
+    def tsprojecterr(self):
+        """
+        Check every file of the current project, the errors are added to
+        the quickfix list as the files get checked
+        """
+        if self._client.server_handle is not None:
+            self.reload()
+            self.tsprojecterrcancel()
+            file = self.relative_file()
+            info = self._client.projectInfo(file, True)
+            total = len([f for f in (info or {}).get('fileNames', [])
+                         if not f.endswith('lib.d.ts')])
+            self.vim.call('setqflist', [], 'r', {'title': 'Project errors'})
+            run = diagnostics.ProjectDiagnostics(
+                self._client,
+                lambda items, checked, done: self.vim.async_call(
+                    self.on_project_errors, run, items, checked, total, done))
+            self._project_errors = run
+            run.start(file)
+        else:
+            self.printError('Server is not Running')
+
+    @neovim.command("TSProjectErrCancel")
+    def tsprojecterrcancel(self):
+        """
+        Stop reporting the errors of a running TSProjectErr
+        """
+        if self._project_errors is not None:
+            self._project_errors.cancel()
+            self._project_errors = None
+
+    def on_project_errors(self, run, items, checked, total, done):
+        if run is not self._project_errors:
+            return
+        calls = []
+        if items:
+            calls.append(['nvim_call_function', ['setqflist', [items, 'a']]])
+        if done:
+            self._project_errors = None
+            message = 'checked {} files'.format(checked)
+        else:
+            message = 'checking files {}/{}'.format(checked, total)
+        calls.append(['nvim_command', ['redraw | echo "nvim-ts: {}"'.format(message)]])
+        self.call_atomic(calls)
+
     @neovim.command("TSSyncErr")
     def tssyncerr(self, args=None):
         """
             Use syntacticDiagnosticsSync and semanticDiagnosticsSync to quickly load errors for the
-            current file.
+            current file. Both requests are sent at once, the result is
+            reused until the buffers change.
         """
         if self._client.server_handle is not None:
             self.reload()
             f = self.relative_file()
-            syntacticRes = self._client.syntacticDiagnosticsSync(f)
-            semanticRes = self._client.semanticDiagnosticsSync(f)
-            if syntacticRes == None or semanticRes == None:
+            changedtick = self.vim.eval('b:changedtick')
+            errors = self._sync_errors.get(f, changedtick)
+            if errors is None:
+                errors = self._client.diagnosticsSync(f)
+            if errors is None:
                 pass
             else:
-                self.reportErrors([{
-                    'text': d['text'],
-                    'lnum': d['start']['line'],
-                    'col': d['start']['offset'],
-                    'end': d['end'],
-                    'filename': f
-                } for d in syntacticRes + semanticRes])
+                self._sync_errors.put(f, changedtick, errors)
+                self.reportErrors(diagnostics.loclist_items(f, errors))
 
         else:
             self.printError('Server is not Running')
 
     @neovim.function("TSGetErrFunc")
     def getErrFunc(self, args):
+        errorLoc = []
         getErrRes = self._client.getErr([self.relative_file()])
         if not getErrRes:
             pass
@@ -321,24 +546,27 @@ class TypescriptHost(object):
             renameRes = self._client.renameSymbol(file, originalLine, offset)
 
             if (renameRes) and (renameRes['info']['canRename']):
-                locs = renameRes['locs']
-                changeCount = 0
-                for loc in locs:
-                    defFile = loc['file']
-                    # self.vim.command('e ' + defFile)
-                    for rename in loc['locs']:
-                        line = rename['start']['line']
-                        col = rename['start']['offset']
-                        self.vim.command(
-                            'cal cursor({}, {})'.format(line, col))
-                        self.vim.command('normal cw{}'.format(newName))
-                        # self.vim.command('write')
-                        changeCount += 1
-                # self.vim.command('e ' + file)
-                self.vim.command(
-                    'cal cursor({}, {})'.format(originalLine, offset))
+                edits = rename.edits_by_file(renameRes['locs'], newName)
+                loaded = dict((name, number) for number, name in self.vim.eval(
+                    "map(filter(range(1, bufnr('$')), 'bufloaded(v:val)'),"
+                    " '[v:val, fnamemodify(bufname(v:val), \":p\")]')"))
+                buffers = [f for f in edits if f in loaded]
+                contents = self.call_atomic([
+                    ['nvim_buf_get_lines', [loaded[f], 0, -1, False]]
+                    for f in buffers])
+                calls = []
+                for f, lines in zip(buffers, contents):
+                    first, last, replacement = rename.apply_edits(
+                        lines, edits[f])
+                    calls.append(['nvim_buf_set_lines',
+                                  [loaded[f], first, last, False, replacement]])
+                self.call_atomic(calls)
+                for f in edits:
+                    if f not in loaded:
+                        rename.rename_on_disk(f, edits[f])
+                changeCount = sum(len(e) for e in edits.values())
                 self.vim.out_write(
-                    'Replaced {} occurences in {} files \n'.format(len(locs), changeCount))
+                    'Replaced {} occurences in {} files \n'.format(changeCount, len(edits)))
             else:
                 self.printError(renameRes['info']['localizedErrorMessage'])
 
@@ -351,7 +579,9 @@ class TypescriptHost(object):
             self.vim.out_write("nvim-ts: %s is already imported\n" % symbol)
             return
 
-        results = utils.getImportCandidates(self._client, self.relative_file(), symbol)
+        results = utils.getImportCandidates(
+            self._client, self.relative_file(), symbol,
+            self.symbol_index(self.relative_file()))
 
         # No imports
         if len(results) == 0:
@@ -361,7 +591,7 @@ class TypescriptHost(object):
         # Only one
         if len(results) == 1:
             importBlock = utils.createImportBlock(symbol, utils.getRelativeImportPath(
-                self.relative_file(), results[0]), self.vim.vars["nvim_typescript#tsimport#template"])
+                self.relative_file(), results[0]), utils.getSetting(self.vim, "tsimport#template"))
 
         # More than one, need to choose
         else:
@@ -384,7 +614,7 @@ class TypescriptHost(object):
             # Value input is present
             else:
                 importBlock = utils.createImportBlock(symbol, utils.getRelativeImportPath(
-                    self.relative_file(), results[int(input)]), self.vim.vars["nvim_typescript#tsimport#template"])
+                    self.relative_file(), results[int(input)]), utils.getSetting(self.vim, "tsimport#template"))
 
         self.vim.current.buffer.append(importBlock, lastImportLine)
 
@@ -432,8 +662,13 @@ class TypescriptHost(object):
     def getWorkspaceSymbolsFunc(self, args=None):
         if self._client.server_handle is not None:
             self.reload()
+            index = self.symbol_index(self.relative_file())
             searchSymbols = self._client.getWorkspaceSymbols(
-                self.relative_file(), args[0])
+                self.relative_file(), args[0],
+                origin='TSGetWorkspaceSymbolsFunc')
+            if index is not None and index.ready():
+                searchSymbols = merge_dependencies(
+                    index.search(args[0]), searchSymbols)
             if not searchSymbols:
                 return []
             else:
@@ -504,8 +739,8 @@ class TypescriptHost(object):
             refs = self._client.getRef(file, line, offset)
 
             if refs:
-                truncateAfter = self.vim.eval(
-                    'g:nvim_typescript#loc_list_item_truncate_after')
+                truncateAfter = utils.getSetting(
+                    self.vim, 'loc_list_item_truncate_after')
                 location_list = []
                 refList = refs["refs"]
                 if len(refList) > -1:
@@ -567,30 +802,31 @@ class TypescriptHost(object):
                     self._last_input_reload = time()
                     self.reload()
 
-                data = self._client.completions(file, line, col, prefix)
+                data = self._client.completions(file, line, col, prefix,
+                                                origin='TSComplete')
                 self.log(data)
                 if len(data) == 0:
                     return []
 
-                if len(data) > self.vim.vars["nvim_typescript#max_completion_detail"]:
-                    filtered = []
-                    for entry in data:
-                        if entry["kind"] != "warning":
-                            filtered.append(entry)
-                        return [utils.convert_completion_data(e, self.vim) for e in filtered]
+                entries = [e for e in data if e["kind"] != "warning"]
+                max_detail = utils.getSetting(self.vim, "max_completion_detail")
 
-                names = []
-                for entry in data:
-                    if (entry["kind"] != "warning"):
-                        names.append(entry["name"])
+                if utils.getSetting(self.vim, "lazy_completion_detail"):
+                    self.complete_lazily(file, line, col, entries, max_detail)
+                    return utils.convert_completion_response(entries, self.vim)
 
-                detailed_data = self._client.completion_entry_details(
-                    file, line, col, names)
+                if len(data) > max_detail:
+                    return utils.convert_completion_response(entries, self.vim)
+
+                detailed_data = self._details.details(
+                    self._client, file, line, col, entries,
+                    self._client.generation())
 
                 if len(detailed_data) == 0:
                     return []
 
-                return [utils.convert_detailed_completion_data(e, self.vim, isDeoplete=False) for e in detailed_data]
+                return utils.convert_completion_response(
+                    detailed_data, self.vim, detailed=True)
 
     @neovim.function('TSGetServerPath', sync=True)
     def tstest(self, args):
@@ -607,7 +843,25 @@ class TypescriptHost(object):
         if self._client.server_handle is None:
             self.tsstart()
         else:
-            self._client.open(self.relative_file())
+            self.open_buffers()
+            self.attach()
+        if utils.getSetting(self.vim, "diagnostics_enable"):
+            errors = self._diagnostics.diagnostics(self.relative_file())
+            if errors is not None:
+                self.reportErrors(diagnostics.loclist_items(
+                    self.relative_file(), errors))
+            self.schedule_diagnostics()
+        self.symbol_index(self.relative_file())
+
+    @neovim.function('TSOnBufUnload')
+    def on_bufunload(self, args):
+        """
+        Close the file of an unloaded buffer in tsserver
+        """
+        file, bufnr = args[0], int(args[1])
+        self._sync.detach(bufnr)
+        self._open_files.forget(file)
+        self._client.close(file)
 
     @neovim.function('TSOnBufSave')
     def on_bufwritepost(self, args=None):
@@ -615,6 +869,15 @@ class TypescriptHost(object):
        On save, reload to detect changes
         """
         self.reload()
+        self._client.saved(self.relative_file())
+        self._sync_errors.clear()
+        self.schedule_diagnostics()
+        index = self.symbol_index(self.relative_file())
+        if index is not None:
+            thread = threading.Thread(
+                target=index.refresh, args=(self._client, self.relative_file()))
+            thread.daemon = True
+            thread.start()
 
     @neovim.function('TSCmRefresh', sync=False)
     def on_cm_refresh(self, args):
@@ -630,7 +893,7 @@ class TypescriptHost(object):
         if self.vim.call('cm#context_changed', ctx):
             return
 
-        max_detail = self.vim.vars["nvim_typescript#max_completion_detail"]
+        max_detail = utils.getSetting(self.vim, "max_completion_detail")
 
         self.reload()
 
@@ -638,49 +901,88 @@ class TypescriptHost(object):
             file=self.relative_file(),
             line=lnum,
             offset=col,
-            prefix=base
+            prefix=base,
+            origin='TSCmRefresh'
         )
 
         if len(data) == 0:
             return []
 
-        matches = []
-        if len(data) > max_detail:
-            filtered = []
-            for entry in data:
-                if entry["kind"] != "warning":
-                    filtered.append(entry)
-            matches = [
-                    utils.convert_completion_data(e, self.vim)
-                    for e in filtered]
-            self.vim.call('cm#complete', info, ctx, startcol, matches)
-            return
+        entries = [e for e in data if e["kind"] != "warning"]
+        file = self.relative_file()
 
-        names = []
-        maxNameLength = 0
+        lazy = utils.getSetting(self.vim, "lazy_completion_detail")
+        if lazy:
+            self.complete_lazily(file, lnum, col, entries, max_detail)
 
-        for entry in data:
-            if entry["kind"] != "warning":
-                names.append(entry["name"])
-                maxNameLength = max(maxNameLength, len(entry["name"]))
+        if lazy or len(data) > max_detail:
+            matches = utils.convert_completion_response(entries, self.vim)
+            self.vim.call('cm#complete', info, ctx, startcol, matches)
+            return
 
-        detailed_data = self._client.completion_entry_details(
-            file=self.relative_file(),
-            line=lnum,
-            offset=col,
-            entry_names=names
-        )
+        detailed_data = self._details.details(
+            self._client, file, lnum, col, entries,
+            self._client.generation())
 
         if len(detailed_data) == 0:
             return
 
-        matches = [
-                utils.convert_detailed_completion_data(e,
-                                                       self.vim,
-                                                       isDeoplete=True)
-                for e in detailed_data]
+        matches = utils.convert_completion_response(
+            detailed_data, self.vim, detailed=True, isDeoplete=True)
         self.vim.call('cm#complete', info, ctx, startcol, matches)
 
+    def complete_lazily(self, file, line, offset, entries, count):
+        """
+        Completion items are returned without details, the first count of
+        them are detailed in the background and the selected one is shown
+        by on_complete_changed
+        """
+        self._details.remember(file, line, offset, entries,
+                               self._client.generation())
+        self._details.prefetch(self._client, count)
+
+    @neovim.function('TSOnCompleteChanged')
+    def on_complete_changed(self, args):
+        """
+        Show the details of the selected completion item in a floating
+        window next to the popup menu
+        """
+        event = args[0] if args else {}
+        item = event.get('completed_item') or {}
+        detail = None
+        if item.get('word') and self._client.server_handle is not None:
+            detail = self._details.detail(self._client, item['word'])
+        if detail is None:
+            self.close_completion_detail()
+            return
+
+        converted = utils.convert_detailed_completion_data(
+            detail, self.vim, isDeoplete=True)
+        lines = converted['info'].split('\n')
+        width = min(max(len(l) for l in lines) + 1, 80)
+        col = event['col'] + event['width'] + (1 if event.get('scrollbar') else 0)
+        config = {
+            'relative': 'editor',
+            'row': event['row'],
+            'col': col,
+            'width': width,
+            'height': min(len(lines), 12),
+            'focusable': False,
+            'style': 'minimal'
+        }
+        if self._detail_window is None or not self._detail_window.valid:
+            buf = self.vim.api.create_buf(False, True)
+            buf[:] = lines
+            self._detail_window = self.vim.api.open_win(buf, False, config)
+        else:
+            self._detail_window.buffer[:] = lines
+            self.vim.api.win_set_config(self._detail_window, config)
+
+    def close_completion_detail(self):
+        if self._detail_window is not None and self._detail_window.valid:
+            self.vim.api.win_close(self._detail_window, True)
+        self._detail_window = None
+
     def printError(self, message):
         self.vim.err_write('nvim-ts: {0}\n'.format(message))
 
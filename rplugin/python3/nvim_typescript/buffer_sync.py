@@ -0,0 +1,229 @@
+import os
+from time import time
+from tempfile import NamedTemporaryFile
+
+
+class BufferSync(object):
+    """
+    Keeps tsserver's copy of attached buffers up to date.
+
+    Buffers are attached with nvim_buf_attach, every nvim_buf_lines_event is
+    replayed on a local mirror of the buffer and forwarded to the server as a
+    "change" request covering only the modified lines. Buffers that cannot be
+    attached (older neovim, vim) keep using a full reload from a temp file.
+
+    For reloaded buffers the b:changedtick that was last sent is remembered,
+    so unchanged buffers are not sent again.
+
+    Buffers whose file isn't open in tsserver (closed while hidden) only
+    update the mirror, the file gets its content back when it is opened
+    again.
+
+    Every file also has a version used to invalidate cached server answers.
+    It moves on every change, except for consecutive edits within a single
+    line, which is what typing the word being completed looks like.
+
+    State is kept on the class so the remote plugin and the deoplete source
+    share it.
+    """
+    __buffers = {}
+    # bufnr -> b:changedtick of the last full reload
+    __ticks = {}
+    # file -> version
+    __versions = {}
+
+    def __init__(self, client):
+        self._client = client
+
+    def attach(self, vim, buffer):
+        """
+        Start following a buffer. Returns False when neovim can't send
+        buffer updates.
+        """
+        if buffer.number in BufferSync.__buffers:
+            return True
+        try:
+            attached = vim.api.buf_attach(buffer, True, {})
+        except Exception:
+            attached = False
+        if attached:
+            BufferSync.__buffers[buffer.number] = {
+                'file': buffer.name,
+                'lines': None,
+                'tick': None,
+                'edited_line': None
+            }
+        return bool(attached)
+
+    def detach(self, bufnr):
+        BufferSync.__buffers.pop(bufnr, None)
+        BufferSync.__ticks.pop(bufnr, None)
+
+    def is_synced(self, bufnr, changedtick=None):
+        """
+        True when the server already has the latest content of the buffer:
+        either it is attached, or its last reload was at changedtick
+        """
+        state = BufferSync.__buffers.get(bufnr)
+        if state is not None and state['lines'] is not None:
+            return True
+        return changedtick is not None and \
+            BufferSync.__ticks.get(bufnr) == changedtick
+
+    def on_lines(self, bufnr, changedtick, firstline, lastline, linedata):
+        state = BufferSync.__buffers.get(bufnr)
+        if state is None:
+            return
+        if state['lines'] is None or lastline == -1:
+            # First event after attaching carries the whole buffer
+            state['lines'] = list(linedata)
+            if self._client.is_open(state['file']):
+                self.reload(state['file'], '\n'.join(state['lines']))
+        elif not self._client.is_open(state['file']):
+            apply_lines_change(state['lines'], firstline, lastline, linedata)
+            self.__bump(state['file'])
+        else:
+            inline = lastline == firstline + 1 and len(linedata) == 1
+            if not inline or state['edited_line'] != firstline:
+                self.__bump(state['file'])
+            state['edited_line'] = firstline if inline else None
+            args = apply_lines_change(
+                state['lines'], firstline, lastline, linedata)
+            args['file'] = state['file']
+            self._client.change(**args)
+        if changedtick is not None:
+            state['tick'] = changedtick
+
+    def on_changedtick(self, bufnr, changedtick):
+        state = BufferSync.__buffers.get(bufnr)
+        if state is not None:
+            state['tick'] = changedtick
+
+    def opened(self, file, bufnr, changedtick):
+        """
+        file was opened with the content of buffer bufnr at changedtick
+        """
+        self.__bump(file)
+        BufferSync.__ticks[bufnr] = changedtick
+
+    def version(self, file):
+        return BufferSync.__versions.get(file, 0)
+
+    @classmethod
+    def __bump(cls, file):
+        cls.__versions[file] = cls.__versions.get(file, 0) + 1
+
+    def resync(self, root=None):
+        """
+        Send the full content of every attached buffer, used after the
+        server has been (re)started. With a root, only the buffers of that
+        project are sent.
+        """
+        BufferSync.__ticks.clear()
+        for state in list(BufferSync.__buffers.values()):
+            if state['lines'] is None:
+                continue
+            if root is not None and \
+                    self._client.project_root_for(state['file']) != root:
+                continue
+            if not self._client.is_open(state['file']):
+                continue
+            self.reload(state['file'], '\n'.join(state['lines']))
+
+    def reload(self, file, contents, bufnr=None, changedtick=None):
+        """
+        Replace the server copy of file with contents through a temp file.
+        When given, changedtick is remembered for is_synced.
+        """
+        tmpfile = NamedTemporaryFile(delete=False)
+        tmpfile.write(contents.encode("utf-8"))
+        tmpfile.close()
+        try:
+            success = self._client.reload(file, tmpfile.name)
+        finally:
+            os.unlink(tmpfile.name)
+        self.__bump(file)
+        if bufnr is not None:
+            if success:
+                BufferSync.__ticks[bufnr] = changedtick
+            else:
+                BufferSync.__ticks.pop(bufnr, None)
+        return success
+
+
+class OpenFiles(object):
+    """
+    When the files open in tsserver were last shown in a window, so the
+    ones hidden for a while can be closed.
+    """
+
+    def __init__(self):
+        # file -> last time it was shown
+        self._shown = {}
+
+    def shown(self, files, now=None):
+        now = time() if now is None else now
+        for file in files:
+            self._shown[file] = now
+
+    def forget(self, file):
+        self._shown.pop(file, None)
+
+    def hidden(self, opened, visible, timeout, now=None):
+        """
+        The opened files not in visible for timeout seconds or more
+        """
+        now = time() if now is None else now
+        self.shown(visible, now)
+        hidden = []
+        for file in opened:
+            if now - self._shown.setdefault(file, now) >= timeout:
+                hidden.append(file)
+        for file in hidden:
+            self.forget(file)
+        return sorted(hidden)
+
+
+def utf16_len(text):
+    """
+    tsserver offsets count UTF-16 code units
+    """
+    return len(text.encode('utf-16-le')) // 2
+
+
+def apply_lines_change(lines, firstline, lastline, linedata):
+    """
+    Apply a nvim_buf_lines_event to the mirrored lines and return the
+    matching tsserver change arguments (without the file).
+
+    :param lines: the mirrored buffer lines, updated in place
+    :param firstline: first replaced line, 0-indexed
+    :param lastline: first line after the replaced range, exclusive
+    :param linedata: the replacement lines
+    """
+    count = len(lines)
+    if lastline < 0 or lastline > count:
+        lastline = count
+    if lastline < count:
+        # Every replaced line is followed by a newline we keep
+        start = (firstline + 1, 1)
+        end = (lastline + 1, 1)
+        text = ''.join(line + '\n' for line in linedata)
+    elif firstline > 0:
+        # Reaching the end of the buffer: there is no trailing newline, so
+        # anchor on the end of the line before the range instead
+        start = (firstline, utf16_len(lines[firstline - 1]) + 1)
+        end = (count, utf16_len(lines[-1]) + 1)
+        text = ''.join('\n' + line for line in linedata)
+    else:
+        start = (1, 1)
+        end = (count, utf16_len(lines[-1]) + 1) if count else (1, 1)
+        text = '\n'.join(linedata)
+    lines[firstline:lastline] = linedata
+    return {
+        'line': start[0],
+        'offset': start[1],
+        'endLine': end[0],
+        'endOffset': end[1],
+        'insertString': text
+    }
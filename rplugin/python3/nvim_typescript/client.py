@@ -1,23 +1,406 @@
 import os
 import sys
 import json
+import shutil
+import tempfile
+import threading
 import subprocess
+from time import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+from project_root import ProjectRoots
+
+
+# events sent for geterr/geterrForProject requests
+DIAGNOSTIC_EVENTS = ["syntaxDiag", "semanticDiag", "suggestionDiag"]
+
+# read-only requests: identical ones in flight share a single request
+COALESCED_COMMANDS = set([
+    "completionEntryDetails", "completions", "definition",
+    "documentHighlights", "navto", "navtree", "projectInfo", "quickinfo",
+    "references", "rename", "semanticDiagnosticsSync", "signatureHelp",
+    "syntacticDiagnosticsSync", "typeDefinition"
+])
+
+# requests made obsolete by the next one of the same command, for the same
+# file and from the same origin
+SUPERSEDED_COMMANDS = set(["completions", "navto", "quickinfo"])
+
+# seconds to wait for a response, per command
+RESPONSE_TIMEOUT_SECONDS = 20
+COMMAND_DEADLINES = {
+    "completions": 3,
+    "completionEntryDetails": 3,
+    "quickinfo": 3,
+    "signatureHelp": 3,
+    "definition": 5,
+    "typeDefinition": 5,
+    "navtree": 5,
+    "navto": 5,
+    "references": 60,
+    "rename": 60,
+    "geterr": 60,
+}
+
+# tsserver options, typings are never fetched from the network
+SERVER_FLAGS = ["--disableAutomaticTypingAcquisition",
+                "--useSingleInferredProject"]
+
+# a server exiting more often than this isn't restarted anymore
+MAX_RESTARTS = 3
+RESTART_WINDOW_SECONDS = 60
+
+# seconds to wait for a killed server to be gone
+KILL_TIMEOUT_SECONDS = 5
+
+# scriptKindName of the files opened with their content
+SCRIPT_KINDS = {".ts": "TS", ".tsx": "TSX", ".js": "JS", ".jsx": "JSX"}
+
+
+class Timeout(dict):
+    """
+    What waiting on a request returns once its deadline passed: an
+    unsuccessful response, so get_response_body gives its default.
+    """
+
+    def __init__(self, command, seq):
+        dict.__init__(self, type="response", command=command,
+                      request_seq=seq, success=False, message="Timed out")
+
+
+class Server(object):
+    """
+    One tsserver process, with a reader thread demultiplexing its output:
+    responses resolve the Future registered for their request_seq, events
+    are handed to on_event.
+
+    With a cancellation_dir, the server is told to look for cancellation
+    files in it (--cancellationPipeName): creating "cancel<seq>" there
+    makes tsserver abandon request seq.
+    """
+
+    def __init__(self, root, command, environ, on_event, cancellation_dir=None,
+                 on_exit=None):
+        self.root = root
+        self.killed = False
+        self.exited = False
+        self.on_exit = on_exit
+        self.last_used = time()
+        self.pending = {}
+        self.cancelled = set()
+        self.cancellation_dir = cancellation_dir
+        if cancellation_dir:
+            command = command + ["--cancellationPipeName",
+                                 os.path.join(cancellation_dir, "cancel*")]
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.on_event = on_event
+        # https://github.com/Microsoft/TypeScript/blob/master/lib/protocol.d.ts#L854
+        self.handle = subprocess.Popen(
+            command,
+            env=environ,
+            cwd=root,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,
+            # batch files can only be run through the shell on windows
+            shell=command[0].lower().endswith(('.cmd', '.bat')),
+            bufsize=-1,
+        )
+        reader = threading.Thread(target=self.__read_loop)
+        reader.daemon = True
+        reader.start()
+
+    def alive(self):
+        return not self.exited and self.handle.poll() is None
+
+    def kill(self):
+        self.killed = True
+        try:
+            self.handle.kill()
+            self.handle.wait(KILL_TIMEOUT_SECONDS)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        with self.write_lock:
+            try:
+                self.handle.stdin.close()
+            except OSError:
+                pass
+        self.fail_pending()
+        if self.cancellation_dir:
+            shutil.rmtree(self.cancellation_dir, ignore_errors=True)
+
+    def write(self, request):
+        serialized_request = (json.dumps(request) + "\n").encode("utf-8")
+        self.last_used = time()
+        with self.write_lock:
+            self.handle.stdin.write(serialized_request)
+            self.handle.stdin.flush()
+
+    def request(self, request):
+        """
+        Write a request, returns a Future resolved with its response, or
+        with None if the server goes away first.
+        """
+        future = Future()
+        future.seq = request['seq']
+        future.command = request['command']
+        future.server = self
+        # callers waiting on it, see Client.send_request_async
+        future.users = 1
+        with self.lock:
+            self.pending[request['seq']] = future
+        try:
+            self.write(request)
+        except (OSError, ValueError):
+            self.forget(request['seq'])
+            future.set_result(None)
+        return future
+
+    def forget(self, seq):
+        """
+        Stop waiting for the response of request seq. Returns its Future
+        when it was still pending.
+        """
+        with self.lock:
+            return self.pending.pop(seq, None)
+
+    def cancel(self, seq):
+        """
+        Ask the server to stop working on request seq. Its Future is
+        resolved with None right away and the late response dropped.
+        """
+        with self.lock:
+            future = self.pending.pop(seq, None)
+            if future is None:
+                # already answered, nothing would clean the file up
+                return
+            self.cancelled.add(seq)
+            if self.cancellation_dir:
+                try:
+                    open(self.__cancellation_file(seq), 'w').close()
+                except OSError:
+                    pass
+        if not future.done():
+            future.set_result(None)
+
+    def __cancellation_file(self, seq):
+        return os.path.join(self.cancellation_dir, "cancel{}".format(seq))
+
+    def fail_pending(self):
+        with self.lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_result(None)
+
+    def __read_loop(self):
+        while True:
+            try:
+                message = read_message(self.handle.stdout)
+            except ValueError:
+                continue
+            except OSError:
+                break
+            if message is None:
+                break
+            self.__dispatch(message)
+        self.handle.stdout.close()
+        self.exited = True
+        self.fail_pending()
+        if not self.killed and self.on_exit is not None:
+            self.on_exit(self)
+
+    def __dispatch(self, message):
+        if message.get("type") == "response":
+            seq = message.get("request_seq")
+        elif message.get("type") == "event":
+            seq = None
+            # Requests without a response (geterr) only report completion
+            if message.get("event") == "requestCompleted":
+                seq = message.get("body", {}).get("request_seq")
+            self.on_event(message, self)
+        else:
+            return
+        with self.lock:
+            future = self.pending.pop(seq, None)
+            cancelled = seq in self.cancelled
+            self.cancelled.discard(seq)
+        if cancelled and self.cancellation_dir:
+            try:
+                os.remove(self.__cancellation_file(seq))
+            except OSError:
+                pass
+        if future is not None and not future.done():
+            future.set_result(message)
+
+
+class ServerPool(object):
+    """
+    One Server per project root, spawned on first use. Once more than
+    max_servers are running, the least recently used one is stopped.
+
+    With standby, a second server is kept loading each project, restart()
+    switches to it instead of starting over.
+    """
+
+    def __init__(self, spawn, max_servers=4, standby=False):
+        self._spawn = spawn
+        self._servers = OrderedDict()
+        self._standby = {}
+        self._lock = threading.Lock()
+        self.max_servers = max_servers
+        self.standby = standby
+
+    def get(self, root):
+        """
+        Returns the server for root, and whether it was just spawned.
+        The server is None when it can't be started.
+        """
+        evicted = []
+        with self._lock:
+            server = self._servers.get(root)
+            spawned = server is None or not server.alive()
+            if spawned:
+                if server is not None:
+                    # dead, its cancellation directory still has to go
+                    evicted.append(server)
+                    del self._servers[root]
+                server = self._spawn(root)
+                if server is None:
+                    spawned = False
+                else:
+                    self._servers[root] = server
+            if server is not None:
+                self._servers.move_to_end(root)
+            while len(self._servers) > max(1, self.max_servers):
+                old = self._servers.popitem(last=False)
+                evicted.append(old[1])
+                if old[0] in self._standby:
+                    evicted.append(self._standby.pop(old[0]))
+            if self.standby and server is not None:
+                standby = self._standby.get(root)
+                if standby is None or not standby.alive():
+                    if standby is not None:
+                        evicted.append(standby)
+                    standby = self._spawn(root)
+                    if standby is None:
+                        self._standby.pop(root, None)
+                    else:
+                        self._standby[root] = standby
+        for old in evicted:
+            old.kill()
+        return server, spawned
+
+    def restart(self):
+        """
+        Replace every server by its standby, the ones without a standby
+        ready are stopped and spawned again on next use.
+        Returns the roots whose standby took over.
+        """
+        promoted = []
+        with self._lock:
+            old = list(self._servers.values())
+            for root in list(self._servers):
+                standby = self._standby.pop(root, None)
+                if standby is not None and standby.alive():
+                    self._servers[root] = standby
+                    promoted.append(root)
+                else:
+                    del self._servers[root]
+        for server in old:
+            server.kill()
+        return promoted
+
+    def servers(self):
+        with self._lock:
+            return list(self._servers.values())
+
+    def owns(self, server):
+        with self._lock:
+            return self._servers.get(server.root) is server
+
+    def stop(self):
+        with self._lock:
+            servers = list(self._servers.values())
+            servers.extend(self._standby.values())
+            self._servers.clear()
+            self._standby.clear()
+        for server in servers:
+            server.kill()
 
 
 class Client(object):
+    """
+    tsserver client. All the state lives on the class, and every frontend
+    of the python host (remote plugin, deoplete, denite) goes through the
+    instance() returned Client.
+
+    Requests can be sent from any thread: writes to a server are
+    serialized and its reader thread hands every response to the Future
+    of its request, so concurrent callers never see each other's answers.
+    """
+    # The ServerPool while started, None when stopped
     server_handle = None
     project_root = None
+    max_servers = 4
+    # node heap size of the servers in MB, 0 for node's default
+    max_old_space_size = 3072
+    standby = False
     __server_seq = 1
+    __server_path = 'tsserver'
     __environ = os.environ.copy()
+    # event name -> (callback, root) pairs, called from the reader threads
+    __event_listeners = {}
+    # callbacks called with the root of every newly spawned server
+    __start_listeners = []
+    # files opened through open()/update_open(), replayed on servers
+    # spawned later
+    __open_files = set()
+    # cleared when a server doesn't know updateOpen (typescript < 2.6)
+    __update_open = True
+    # (command, arguments) -> Future of a read-only request in flight
+    __in_flight = {}
+    # moves on every request that may change the answers of the servers
+    __generation = 0
+    # (command, file, origin) -> Future of its latest request, see
+    # SUPERSEDED_COMMANDS
+    __latest = {}
+    # root -> times its server was restarted after exiting
+    __restarts = {}
+    # runs a function on the host thread, see schedule_with
+    __schedule = None
+    # the command of the last server that couldn't be started, reported once
+    __spawn_error = None
+    __instance = None
+    __roots = ProjectRoots()
+    __lock = threading.Lock()
 
     def __init__(self, log_fn=None, debug_fn=None):
         self.log_fn = log_fn
         self.debug_fn = debug_fn
 
+    @classmethod
+    def instance(cls, log_fn=None, debug_fn=None):
+        """
+        The Client shared by every frontend
+        """
+        with cls.__lock:
+            if cls.__instance is None:
+                cls.__instance = cls()
+            client = cls.__instance
+        if log_fn:
+            client.log_fn = log_fn
+        if debug_fn:
+            client.debug_fn = debug_fn
+        return client
+
     @classmethod
     def __get_next_seq(cls):
-        seq = cls.__server_seq
-        cls.__server_seq += 1
+        with cls.__lock:
+            seq = cls.__server_seq
+            cls.__server_seq += 1
         return seq
 
     @property
@@ -25,7 +408,7 @@ class Client(object):
         """
         Server path property
         """
-        return self._serverPath
+        return Client.__server_path
 
     @serverPath.setter
     def serverPath(self, value):
@@ -33,31 +416,51 @@ class Client(object):
         Set the server Path
         """
         if os.path.isfile(value):
-            self._serverPath = value
+            # servers run from their project root, don't resolve from there
+            Client.__server_path = os.path.abspath(value)
         else:
-            self._serverPath = 'tsserver'
+            Client.__server_path = 'tsserver'
+
+    def configure(self, settings):
+        """
+        Apply the g:nvim_typescript#* settings the servers are started
+        with. They live on the class, the next start() uses them.
+
+        :type settings: dict, see utils.getSettings
+        """
+        self.serverPath = settings.get("server_path") or 'tsserver'
+        Client.max_servers = settings.get("max_servers") or 4
+        Client.max_old_space_size = settings.get("max_old_space_size", 3072)
+        Client.standby = bool(settings.get("standby_server", 0))
 
     def project_cwd(self, root):
-        mydir = root
-        if mydir:
-            projectdir = mydir
-            while True:
-                parent = os.path.dirname(mydir[:-1])
-                if not parent:
-                    break
-                if os.path.isfile(os.path.join(mydir, "tsconfig.json")) or \
-                        os.path.isfile(os.path.join(mydir, "jsconfig.json")):
-                    projectdir = mydir
-                    break
-                mydir = parent
-        # I know, checking again?
-        # This function needs to either return the path, or Flase, so it's
-        # needed
-        if os.path.isfile(os.path.join(projectdir, 'tsconfig.json')) or os.path.isfile(os.path.join(projectdir, 'jsconfig.json')):
-            Client.project_root = projectdir
-            return projectdir
-        else:
+        """
+        The project root of root (a directory or a file), False outside
+        of any project. See ProjectRoots.
+        """
+        if not root:
             return False
+        if os.path.isfile(root):
+            root = os.path.dirname(root)
+        return self.__project_root(root) or False
+
+    @classmethod
+    def __project_root(cls, directory):
+        projectdir = cls.__roots.root(directory)
+        if projectdir is not None:
+            cls.project_root = projectdir
+        return projectdir
+
+    def project_root_for(self, file):
+        """
+        The root of the project file belongs to: its tsconfig/jsconfig
+        directory, or the cwd for files outside of any project.
+        Without a file, the last project used.
+        """
+        if not file:
+            return Client.project_root or os.getcwd()
+        directory = os.path.dirname(os.path.abspath(file))
+        return self.__project_root(directory) or os.getcwd()
 
     def __log(self, message):
         if self.log_fn:
@@ -71,27 +474,20 @@ class Client(object):
         """
         send a stop request
         """
-        Client.server_handle.kill()
+        pool = Client.server_handle
         Client.server_handle = None
+        if pool is not None:
+            pool.stop()
 
     def start(self):
         """
         start proc
+        Servers are spawned lazily, one per project, by the first request
+        for a file of that project.
         """
-        # https://github.com/Microsoft/TypeScript/blob/master/lib/protocol.d.ts#L854
         if Client.server_handle is None:
-            # Client.__environ['TSS_LOG'] = "-logToFile true -file ./server.log"
-            Client.server_handle = subprocess.Popen(
-                [self.serverPath, "--disableAutomaticTypingAcquisition"],
-                env=Client.__environ,
-                cwd=os.getcwd(),
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=None,
-                universal_newlines=True,
-                shell=True,
-                bufsize=-1,
-            )
+            Client.server_handle = ServerPool(
+                self.__spawn, Client.max_servers, Client.standby)
             return True
         else:
             return
@@ -100,55 +496,307 @@ class Client(object):
         """
         internal
         start/stop the proc
+        With standby servers, they take over right away instead.
         """
-        self.stop()
-        self.start()
+        pool = Client.server_handle
+        if pool is None or not pool.standby:
+            self.stop()
+            self.start()
+            return
+        for root in pool.restart():
+            # the standby only has the files as they were when it started
+            for listener in list(Client.__start_listeners):
+                listener(root)
 
-    def __write_to_server(self, data):
-        serialized_request = json.dumps(data) + "\n"
-        Client.server_handle.stdin.write(serialized_request)
-        Client.server_handle.stdin.flush()
+    def __spawn(self, root):
+        """
+        Start the server of root and open the files of that project on it,
+        before any request can reach it.
+        """
+        # Client.__environ['TSS_LOG'] = "-logToFile true -file ./server.log"
+        command = server_command(Client.__server_path,
+                                 Client.max_old_space_size)
+        cancellation_dir = tempfile.mkdtemp(prefix="nvim-typescript-")
+        try:
+            server = Server(root, command + SERVER_FLAGS,
+                            Client.__environ, Client.__dispatch_event,
+                            cancellation_dir, self.__on_server_exit)
+        except OSError as error:
+            shutil.rmtree(cancellation_dir, ignore_errors=True)
+            with Client.__lock:
+                reported = Client.__spawn_error == command
+                Client.__spawn_error = command
+            if not reported:
+                self.__log("Could not start {0}: {1}".format(
+                    " ".join(command), error))
+            return None
+        with Client.__lock:
+            Client.__spawn_error = None
+        for opened in self.open_files():
+            if self.project_root_for(opened) == root:
+                server.write(self.build_request("open", {"file": opened}))
+        return server
 
-    def send_request(self, command, arguments=None):
+    def __on_server_exit(self, server):
         """
-            Sends a properly formated request to the server
+        A server exited on its own: start it again right away, with its
+        open files, unless it keeps crashing. Called on the reader thread
+        of the dead server, the restart goes through schedule_with.
+        """
+        pool = Client.server_handle
+        if pool is None or not pool.owns(server):
+            return
+        now = time()
+        with Client.__lock:
+            restarts = [t for t in Client.__restarts.get(server.root, [])
+                        if now - t < RESTART_WINDOW_SECONDS]
+            if len(restarts) >= MAX_RESTARTS:
+                return
+            Client.__restarts[server.root] = restarts + [now]
+        schedule = Client.__schedule
+        if schedule is None:
+            self.__respawn(server)
+        else:
+            schedule(self.__respawn, server)
+
+    def __respawn(self, server):
+        pool = Client.server_handle
+        if pool is not None and pool.owns(server):
+            self.__server_for_root(server.root)
+
+    @classmethod
+    def __dispatch_event(cls, message, server=None):
+        with cls.__lock:
+            listeners = list(cls.__event_listeners.get(message.get("event"), []))
+        for listener, root in listeners:
+            if root is not None and (server is None or server.root != root):
+                continue
+            try:
+                listener(message)
+            except Exception:
+                pass
+
+    @classmethod
+    def __invalidate(cls):
+        """
+        Something is about to change on the server side, the read-only
+        requests in flight can't be shared by new callers anymore
+        """
+        with cls.__lock:
+            cls.__in_flight.clear()
+            cls.__generation += 1
+
+    def generation(self):
+        """
+            A number moved by every change sent to any server (edits,
+            reloads, opened and closed files, saves), answers cached under
+            an older one may be stale.
+        """
+        return Client.__generation
+
+    def saved(self, file):
+        """
+            file was written, the servers watching it may answer differently
+            even when its content was already synced
+        """
+        Client.__invalidate()
+
+    def __server_for(self, arguments):
+        """
+        Pick the server in charge of the request file, spawning it when
+        needed.
+        """
+        pool = Client.server_handle
+        if pool is None:
+            return None
+        arguments = arguments or {}
+        file = arguments.get("file")
+        if not file and arguments.get("files"):
+            file = arguments["files"][0]
+        if not file and arguments.get("openFiles"):
+            file = arguments["openFiles"][0]["file"]
+        if not file and arguments.get("closedFiles"):
+            file = arguments["closedFiles"][0]
+        return self.__server_for_root(self.project_root_for(file))
+
+    def __server_for_root(self, root):
+        pool = Client.server_handle
+        if pool is None:
+            return None
+        server, spawned = pool.get(root)
+        if spawned:
+            for listener in list(Client.__start_listeners):
+                listener(root)
+        return server
+
+    def on_event(self, event, callback, root=None):
+        """
+            Register a callback for a server event. Callbacks are run on
+            the reader threads, anything touching vim has to go through
+            vim.async_call.
+
+            :type event: string
+            :type callback: function
+            :type root: string, only the events of the server of that
+                        project root when given
+        """
+        with Client.__lock:
+            Client.__event_listeners.setdefault(event, []).append(
+                (callback, root))
+
+    def off_event(self, event, callback):
+        with Client.__lock:
+            listeners = Client.__event_listeners.get(event, [])
+            listeners[:] = [entry for entry in listeners
+                            if entry[0] != callback]
+
+    def on_server_start(self, callback):
+        """
+            Register a callback called with the project root whenever a
+            server is spawned, after the open files have been replayed.
+
+            :type callback: function
+        """
+        Client.__start_listeners.append(callback)
+
+    def schedule_with(self, schedule):
+        """
+            Have the servers that exit on their own started again through
+            schedule instead of on their reader thread, so the start
+            listeners run on the host thread like any other request.
+
+            :type schedule: function, called as schedule(fn, *args),
+                            like vim.async_call
+        """
+        Client.__schedule = schedule
+
+    def wait_for_event(self, event):
+        """
+            Returns a Future resolved with the next `event` sent by the server
+        """
+        future = Future()
+
+        def resolve(message):
+            self.off_event(event, resolve)
+            if not future.done():
+                future.set_result(message)
+        self.on_event(event, resolve)
+        return future
+
+    def send_request_async(self, command, arguments=None, origin=None):
+        """
+            Writes a request to the server of the file it is about,
+            without waiting for it.
+            Returns a Future resolved with the response, or with None if
+            the server goes away first.
+            A read-only request identical to one still in flight gets the
+            Future of that one instead of being sent again. A completions,
+            navto or quickinfo request cancels the previous one of the
+            same origin for the same file, unless another caller shares it.
+
             :type command: string
             :type arguments: dict
-            :type wait_for_response: boolean
+            :type origin: string, the frontend or command sending it
         """
-        request = self.build_request(command, arguments)
-        self.__write_to_server(request)
+        key = None
+        if command in COALESCED_COMMANDS:
+            key = (command, json.dumps(arguments, sort_keys=True))
+            with Client.__lock:
+                future = Client.__in_flight.get(key)
+                if future is not None and not future.done():
+                    future.users += 1
+                    return future
+        else:
+            Client.__invalidate()
+        server = self.__server_for(arguments)
+        if server is None:
+            future = Future()
+            future.set_result(None)
+            return future
+        future = server.request(self.build_request(command, arguments))
+        if command in SUPERSEDED_COMMANDS:
+            latest = (command, (arguments or {}).get("file"), origin)
+            with Client.__lock:
+                previous = Client.__latest.get(latest)
+                Client.__latest[latest] = future
+                shared = previous is not None and previous.users > 1
+            if previous is not None and not shared:
+                self.cancel(previous)
+        if key is not None:
+            with Client.__lock:
+                Client.__in_flight[key] = future
+            future.add_done_callback(
+                lambda done: Client.__forget_in_flight(key, done))
+        return future
 
-        linecount = 0
-        headers = {}
-        while True:
-            headerline = Client.server_handle.stdout.readline().strip()
-            newline = Client.server_handle.stdout.readline().strip()
-            content = Client.server_handle.stdout.readline().strip()
-            ret = json.loads(content)
-            # TS 1.9.x returns two reload finished responses
-            if ('body', {'reloadFinished': True}) in ret.items():
-                continue
-            # TS 2.0.6 introduces configFileDiag event, ignore
-            if ("event", "requestCompleted") in ret.items():
-                continue
-            if ("event", "configFileDiag") in ret.items():
-                continue
-            if "request_seq" not in ret:
-                if ("event", "syntaxDiag") in ret.items():
-                    continue
-                if ("event", "semanticDiag") in ret.items():
-                    return ret
-                else:
-                    continue
-            if ret["request_seq"] > request['seq']:
-                return None
-            if ret["request_seq"] == request['seq']:
-                return ret
+    @classmethod
+    def __forget_in_flight(cls, key, future):
+        with cls.__lock:
+            if cls.__in_flight.get(key) is future:
+                del cls.__in_flight[key]
+
+    def cancel(self, future):
+        """
+            Cancel a request sent with send_request_async, waiters get None.
+            A request shared with other callers is only given up by this
+            one, it is cancelled once none of them waits for it anymore.
+        """
+        server = getattr(future, 'server', None)
+        if server is None or future.done():
+            return
+        with Client.__lock:
+            future.users -= 1
+            unused = future.users <= 0
+        if unused:
+            server.cancel(future.seq)
+
+    def wait(self, future, timeout=None):
+        """
+            Wait for a Future from send_request_async, by default for the
+            deadline of its command (COMMAND_DEADLINES).
+            Returns a Timeout when the deadline passes, the late response
+            is dropped by the reader.
+
+            :type timeout: number
+        """
+        command = getattr(future, 'command', None)
+        if timeout is None:
+            timeout = COMMAND_DEADLINES.get(command, RESPONSE_TIMEOUT_SECONDS)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            server = getattr(future, 'server', None)
+            with Client.__lock:
+                future.users -= 1
+                unused = future.users <= 0
+            if server is not None and unused and \
+                    server.forget(future.seq) is future:
+                # resolved, so it leaves the requests in flight and the
+                # next identical one is sent again
+                future.set_result(None)
+            return Timeout(command, future.seq)
+
+    def send_request(self, command, arguments=None, timeout=None,
+                     origin=None):
+        """
+            Sends a properly formated request to the server
+            :type command: string
+            :type arguments: dict
+            :type timeout: number
+            :type origin: string, see send_request_async
+        """
+        return self.wait(
+            self.send_request_async(command, arguments, origin), timeout)
 
     def send_command(self, command, arguments=None):
-        request = self.build_request(command, arguments)
-        self.__write_to_server(request)
+        Client.__invalidate()
+        server = self.__server_for(arguments)
+        if server is None:
+            return
+        try:
+            server.write(self.build_request(command, arguments))
+        except (OSError, ValueError):
+            pass
 
     def build_request(self, command, arguments=None):
         request = {
@@ -160,26 +808,102 @@ class Client(object):
             request['arguments'] = arguments
         return request
 
-    def open(self, file):
+    def open(self, file, fileContent=None):
         """
-            Sends an "open" request
+            Opens file in tsserver, unless it is already open
 
             :type file: string
+            :type fileContent: string
         """
-        args = {"file": file}
-        self.send_command("open", args)
+        self.update_open({file: fileContent})
+
+    def open_files(self):
+        """
+            The files opened in tsserver
+        """
+        with Client.__lock:
+            return set(Client.__open_files)
+
+    def is_open(self, file):
+        with Client.__lock:
+            return file in Client.__open_files
 
     def close(self, file):
         """
-            Sends a "close" request
+            Closes file in tsserver, if it is open
 
             :type file: string
         """
-        args = {"file": file}
-        self.send_command("close", args)
+        self.update_open(closed=[file])
+
+    def update_open(self, opened=None, closed=()):
+        """
+            Opens and closes files with a single "updateOpen" request per
+            server. Files already in the requested state are left out.
+            Servers that don't know updateOpen get "open" and "close"
+            requests instead.
+            Returns the (opened, closed) files that changed state.
+
+            :type opened: dict, file -> its content, None to read it from disk
+            :type closed: list
+        """
+        opened = opened or {}
+        with Client.__lock:
+            opened = dict((f, c) for f, c in opened.items()
+                          if f and f not in Client.__open_files)
+            closed = [f for f in closed
+                      if f in Client.__open_files and f not in opened]
+            Client.__open_files.update(opened)
+            Client.__open_files.difference_update(closed)
+        byRoot = {}
+        for file in opened:
+            byRoot.setdefault(self.project_root_for(file), ([], []))[0] \
+                .append(file)
+        for file in closed:
+            byRoot.setdefault(self.project_root_for(file), ([], []))[1] \
+                .append(file)
+        for toOpen, toClose in byRoot.values():
+            openFiles = []
+            for file in toOpen:
+                args = {"file": file}
+                if opened[file] is not None:
+                    args["fileContent"] = opened[file]
+                    if file_kind(file) is not None:
+                        args["scriptKindName"] = file_kind(file)
+                openFiles.append(args)
+            self.__send_update_open(openFiles, toClose)
+        return sorted(opened), sorted(closed)
+
+    def __send_update_open(self, openFiles, closedFiles):
+        def fallback(done):
+            response = done.result()
+            if response is None or response.get("success", True) or \
+                    "Unrecognized" not in response.get("message", ""):
+                return
+            Client.__update_open = False
+            self.__send_open_close(openFiles, closedFiles)
+
+        if Client.__update_open:
+            future = self.send_request_async(
+                "updateOpen",
+                {"openFiles": openFiles, "closedFiles": closedFiles})
+            future.add_done_callback(fallback)
+        else:
+            self.__send_open_close(openFiles, closedFiles)
+
+    def __send_open_close(self, openFiles, closedFiles):
+        for file in closedFiles:
+            self.send_command("close", {"file": file})
+        for args in openFiles:
+            self.send_command("open", args)
 
     def refresh(self):
-        self.send_command("reloadProjects")
+        pool = Client.server_handle
+        if pool is None:
+            return
+        Client.__invalidate()
+        for server in pool.servers():
+            server.write(self.build_request("reloadProjects"))
 
     def saveto(self, file, tmpfile):
         """
@@ -203,10 +927,66 @@ class Client(object):
 
         return response["success"] if response and "success" in response else False
 
-    def getErr(self, files):
-        args = {"files": files}
-        response = self.send_request("geterr", args)
-        return get_error_res_body(response)
+    def change(self, file, line, offset, endLine, endOffset, insertString):
+        """
+            Sends a "change" request, replacing the given range of file
+
+            :type file: string
+            :type line: number
+            :type offset: number
+            :type endLine: number
+            :type endOffset: number
+            :type insertString: string
+        """
+        args = {
+            "file": file,
+            "line": line,
+            "offset": offset,
+            "endLine": endLine,
+            "endOffset": endOffset,
+            "insertString": insertString
+        }
+        self.send_command("change", args)
+
+    def getErr(self, files, timeout=None):
+        """
+            Sends a "geterr" request and collects the syntaxDiag and
+            semanticDiag events of the files until it completes.
+            Returns the diagnostics of the first file.
+
+            :type files: array
+            :type timeout: number
+        """
+        args = {"files": files, "delay": 0}
+        diagnostics = {}
+
+        def collect(message):
+            body = message.get("body") or {}
+            if body.get("file") in files:
+                diagnostics.setdefault(body["file"], []).extend(
+                    body.get("diagnostics", []))
+        for event in DIAGNOSTIC_EVENTS[:2]:
+            self.on_event(event, collect)
+        try:
+            self.send_request("geterr", args, timeout)
+        finally:
+            for event in DIAGNOSTIC_EVENTS[:2]:
+                self.off_event(event, collect)
+
+        if files[0] not in diagnostics:
+            return get_error_res_body(None)
+        return {"file": files[0], "diagnostics": diagnostics[files[0]]}
+
+    def getErrForProject(self, file):
+        """
+            Sends a "geterrForProject" request, the diagnostics of every
+            file in the project of file come as events.
+            Returns a future resolved once all the files were checked.
+
+            :type file: string
+        """
+        args = {"file": file, "delay": 0}
+        return self.send_request_async("geterrForProject", args)
 
     def syntacticDiagnosticsSync(self, file):
         args = {"file": file}
@@ -218,26 +998,54 @@ class Client(object):
         response = self.send_request("semanticDiagnosticsSync", args)
         return get_response_body(response)
 
+    def diagnosticsSync(self, file, semantic=True):
+        """
+            Sends the syntacticDiagnosticsSync and semanticDiagnosticsSync
+            requests back to back and collects both.
+            Semantic diagnostics are left out when the file has syntax
+            errors, or when semantic is False.
+            Returns None if the server didn't answer.
+
+            :type file: string
+            :type semantic: bool
+        """
+        args = {"file": file}
+        syntactic = self.send_request_async("syntacticDiagnosticsSync", args)
+        if semantic:
+            semantic = self.send_request_async("semanticDiagnosticsSync", args)
+        errors = get_response_body(self.wait(syntactic), None)
+        if errors is None or errors or not semantic:
+            if semantic:
+                self.cancel(semantic)
+            return errors
+        semanticErrors = get_response_body(self.wait(semantic), None)
+        if semanticErrors is None:
+            return None
+        return errors + semanticErrors
+
     def getDocumentSymbols(self, file):
         args = {"file": file}
         response = self.send_request("navtree", args)
         return get_response_body(response)
 
-    def getWorkspaceSymbols(self, file, term=''):
-        args = {"file": file, "searchValue": term, "maxResultCount": 50}
-        response = self.send_request("navto", args)
+    def getWorkspaceSymbols(self, file, term='', maxResultCount=50,
+                            origin=None):
+        args = {"file": file, "searchValue": term,
+                "maxResultCount": maxResultCount}
+        response = self.send_request("navto", args, origin=origin)
         return get_response_body(response)
 
-    def getDoc(self, file, line, offset):
+    def getDoc(self, file, line, offset, origin=None):
         """
             Sends a "quickinfo" request
 
             :type file: string
             :type line: number
             :type offset: number
+            :type origin: string, see send_request_async
         """
         args = {"file": file, "line": line, "offset": offset}
-        response = self.send_request("quickinfo", args)
+        response = self.send_request("quickinfo", args, origin=origin)
         return get_response_body(response)
 
     def getSignature(self, file, line, offset):
@@ -287,7 +1095,7 @@ class Client(object):
         response = self.send_request("rename", args)
         return get_response_body(response)
 
-    def completions(self, file, line, offset, prefix=""):
+    def completions(self, file, line, offset, prefix="", origin=None):
         """
             Sends a "completions" request
 
@@ -295,6 +1103,7 @@ class Client(object):
             :type line: int
             :type offset: int
             :type prefix: string
+            :type origin: string, see send_request_async
         """
         args = {
             "file": file,
@@ -303,7 +1112,7 @@ class Client(object):
             "prefix": prefix
         }
 
-        response = self.send_request("completions", args)
+        response = self.send_request("completions", args, origin=origin)
 
         return get_response_body(response)
 
@@ -326,18 +1135,85 @@ class Client(object):
         response = self.send_request("completionEntryDetails", args)
         return get_response_body(response)
 
-    def projectInfo(self, file):
+    def projectInfo(self, file, needFileNameList=False):
         args = {
             'file': file,
-            'needFileNameList': 'false'
+            'needFileNameList': needFileNameList
         }
         response = self.send_request("projectInfo", args)
         return get_response_body(response)
 
 
+def server_command(path, max_old_space_size=0):
+    """
+    The command starting the tsserver at path (a file, or a command on
+    the PATH). node runs its tsserver.js directly when both can be found,
+    otherwise path itself is run.
+
+    :type path: string
+    :type max_old_space_size: int
+    """
+    executable = path if os.path.isfile(path) else shutil.which(path)
+    if not executable:
+        return [path]
+    real = os.path.realpath(executable)
+    scripts = [
+        # typescript/bin/tsserver, node_modules/.bin/tsserver links to it
+        os.path.join(os.path.dirname(real), '..', 'lib', 'tsserver.js'),
+        # node_modules/.bin/tsserver(.cmd) not being a link
+        os.path.join(os.path.dirname(executable), '..', 'typescript', 'lib',
+                     'tsserver.js')
+    ]
+    if real.endswith('.js'):
+        scripts.insert(0, real)
+    node = shutil.which('node')
+    for script in scripts:
+        if node and os.path.isfile(script):
+            command = [node]
+            if max_old_space_size:
+                command.append(
+                    '--max-old-space-size={}'.format(max_old_space_size))
+            return command + [os.path.normpath(script)]
+    return [real]
+
+
+def file_kind(file):
+    """
+    The scriptKindName of file, None when tsserver should guess it
+    """
+    return SCRIPT_KINDS.get(os.path.splitext(file)[1].lower())
+
+
+def read_message(stream):
+    """
+        Read one Content-Length framed message from a binary stream.
+        Returns None once the stream is closed.
+
+        :type stream: io.BufferedReader
+    """
+    length = None
+    while True:
+        header = stream.readline()
+        if not header:
+            return None
+        header = header.strip()
+        if not header:
+            # A blank line ends the headers, stray ones before them are noise
+            if length is not None:
+                break
+            continue
+        name, _, value = header.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body.decode("utf-8"))
+
+
 def get_error_res_body(response, default=[]):
     # Should we raise an error if success == False ?
-    return response["body"]
+    return response["body"] if response and "body" in response else default
 
 
 def get_response_body(response, default=[]):
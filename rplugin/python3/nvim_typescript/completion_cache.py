@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+
+DETAIL_CACHE_SIZE = 1000
+
+
+class CompletionCache(object):
+    """
+    Remembers the completions response of the current completion session,
+    so the following keystrokes in the same word are answered locally
+    instead of asking tsserver again.
+
+    A session is identified by a key, usually the file and its version (see
+    BufferSync.version), line, start column of the word and the text
+    before it. It lasts as long as the typed
+    prefix keeps extending the prefix of the original request.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._key = None
+        self._prefix = None
+        self._entries = None
+        self._filtered = False
+
+    def get(self, key, prefix):
+        """
+        The cached entries matching prefix, None on a cache miss
+        """
+        if self._entries is None or self._key != key or \
+                not prefix.startswith(self._prefix):
+            return None
+        if not self._filtered:
+            # The server returned everything (member completion), leave the
+            # filtering to the completion engine like it would have
+            return self._entries
+        lower = prefix.lower()
+        return [e for e in self._entries if e['name'].lower().startswith(lower)]
+
+    def put(self, key, prefix, entries):
+        lower = prefix.lower()
+        self._key = key
+        self._prefix = prefix
+        self._entries = entries
+        # tsserver only filters by prefix outside of member completions
+        self._filtered = bool(prefix) and \
+            all(e['name'].lower().startswith(lower) for e in entries)
+
+
+class DetailCache(object):
+    """
+    Bounded LRU of completionEntryDetails entries, keyed by file, client
+    generation (see Client.generation), entry name and source, so only the
+    entries that were not detailed yet are sent to the server. Any change
+    in the project, even to another file, drops the older details.
+
+    The entries are shared by every frontend, so they are kept raw and
+    converted by the caller.
+    """
+    __entries = OrderedDict()
+    __lock = threading.Lock()
+    # the last completion request returned without details
+    __session = None
+
+    def __init__(self, size=DETAIL_CACHE_SIZE):
+        self.size = size
+
+    def details(self, client, file, line, offset, entries, generation):
+        """
+        The completionEntryDetails of the given completions entries, in
+        the same order. Entries the server has no details for are left out.
+
+        :param client: the tsserver client
+        :param entries: entries from a completions response
+        :param generation: client generation of the completions response
+        """
+        keys = [(file, generation, e["name"], e.get("source"))
+                for e in entries]
+        found = {}
+        with DetailCache.__lock:
+            for key in keys:
+                if key in DetailCache.__entries:
+                    DetailCache.__entries.move_to_end(key)
+                    found[key] = DetailCache.__entries[key]
+
+        missing = [(key, entry) for key, entry in zip(keys, entries)
+                   if key not in found]
+        if missing:
+            names = [entry_name(entry) for _, entry in missing]
+            response = client.completion_entry_details(
+                file, line, offset, names)
+            # Details come back in the order they were asked for, minus the
+            # names the server couldn't resolve
+            index = 0
+            with DetailCache.__lock:
+                for detail in response:
+                    while index < len(missing) and \
+                            missing[index][1]["name"] != detail["name"]:
+                        index += 1
+                    if index == len(missing):
+                        break
+                    key = missing[index][0]
+                    found[key] = detail
+                    DetailCache.__entries[key] = detail
+                    index += 1
+                while len(DetailCache.__entries) > self.size:
+                    DetailCache.__entries.popitem(last=False)
+
+        return [found[key] for key in keys if key in found]
+
+    def clear(self):
+        with DetailCache.__lock:
+            DetailCache.__entries.clear()
+        DetailCache.__session = None
+
+    def remember(self, file, line, offset, entries, generation):
+        """
+        Remember a completion request answered without details, so the
+        details of its items can be resolved on demand with detail()
+        """
+        DetailCache.__session = {
+            "file": file,
+            "line": line,
+            "offset": offset,
+            "entries": entries,
+            "generation": generation
+        }
+
+    def prefetch(self, client, count):
+        """
+        Fetch the details of the first count entries of the remembered
+        request in the background
+        """
+        session = DetailCache.__session
+        if session is None or count <= 0:
+            return
+
+        def fetch():
+            try:
+                self.details(client, session["file"], session["line"],
+                             session["offset"], session["entries"][:count],
+                             session["generation"])
+            except Exception:
+                pass
+        thread = threading.Thread(target=fetch)
+        thread.daemon = True
+        thread.start()
+
+    def detail(self, client, name):
+        """
+        Details of the item called name in the remembered request, None if
+        it isn't one of its items
+        """
+        session = DetailCache.__session
+        if session is None:
+            return None
+        entries = [e for e in session["entries"] if e["name"] == name][:1]
+        if not entries:
+            return None
+        details = self.details(client, session["file"], session["line"],
+                               session["offset"], entries, session["generation"])
+        return details[0] if details else None
+
+
+def entry_name(entry):
+    """
+    The entryNames item for a completions entry: entries coming from
+    another module (auto imports) need their source to be resolved.
+    """
+    if entry.get("source"):
+        return {"name": entry["name"], "source": entry["source"]}
+    return entry["name"]
@@ -0,0 +1,295 @@
+import threading
+from client import DIAGNOSTIC_EVENTS
+
+# files checked between two updates of the quickfix list
+PROJECT_CHUNK_SIZE = 50
+
+# seconds after which a geterrForProject is reported done even though its
+# requestCompleted event never came
+PROJECT_DEADLINE_SECONDS = 300
+
+# the events reported as errors, suggestionDiag hints are left out
+ERROR_EVENTS = DIAGNOSTIC_EVENTS[:2]
+
+
+def highlights_for(errors, bufname, group='ERROR'):
+    """
+    The highlights for the errors reported against bufname, as
+    (group, line, col_start, col_end) with 0-indexed lines and columns
+    like nvim_buf_add_highlight expects.
+    """
+    highlights = set()
+    for e in errors:
+        if e['filename'] != bufname:
+            continue
+        # highlight to end of line if the error goes past the line
+        end = e['end']['offset'] - 1 if e['end']['line'] == e['lnum'] else -1
+        highlights.add((group, e['lnum'] - 1, e['col'] - 1, end))
+    return highlights
+
+
+def highlight_calls(buffer, src_id, previous, current):
+    """
+    nvim_call_atomic calls turning the previous highlights of buffer into
+    the current ones. Only the lines where a highlight was added or removed
+    are cleared and highlighted again. With previous set to None, the whole
+    source is cleared first.
+
+    :param buffer: the buffer the highlights belong to
+    :param src_id: the highlight source
+    :param previous: set of highlights already applied, or None
+    :param current: set of highlights to apply
+    """
+    if previous is None:
+        calls = [['nvim_buf_clear_highlight', [buffer, src_id, 0, -1]]]
+        changed = current
+    else:
+        lines = set(h[1] for h in previous ^ current)
+        calls = [['nvim_buf_clear_highlight', [buffer, src_id, start, end]]
+                 for start, end in _line_ranges(lines)]
+        changed = [h for h in current if h[1] in lines]
+    for group, line, col_start, col_end in sorted(changed, key=lambda h: h[1:]):
+        calls.append(['nvim_buf_add_highlight',
+                      [buffer, src_id, group, line, col_start, col_end]])
+    return calls
+
+
+def loclist_items(filename, diagnostics):
+    """
+    Convert tsserver diagnostics to location list items, as reportErrors
+    expects them
+    """
+    return [{
+        'filename': filename,
+        'lnum': d['start']['line'],
+        'col': d['start']['offset'],
+        'end': d['end'],
+        'text': d['text'],
+        'type': d.get('category', 'error')[0].upper()
+    } for d in diagnostics]
+
+
+def _line_ranges(lines):
+    """
+    Merge line numbers into [start, end) ranges
+    """
+    ranges = []
+    for line in sorted(lines):
+        if ranges and ranges[-1][1] == line:
+            ranges[-1][1] = line + 1
+        else:
+            ranges.append([line, line + 1])
+    return ranges
+
+
+class DiagnosticsCache(object):
+    """
+    The last diagnostics of each file, returned while the buffer version
+    they were computed for is current. Cleared on any edit since the
+    semantic errors of a file depend on the others.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, file, version):
+        entry = self._entries.get(file)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        return None
+
+    def put(self, file, version, errors):
+        self._entries[file] = (version, errors)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class DiagnosticsService(object):
+    """
+    Background diagnostics of the visible files.
+
+    schedule() is called on every change; once changes have settled for
+    `delay` seconds a geterr request is sent for the files returned by
+    get_files, one per project. The syntaxDiag/semanticDiag events it
+    produces are collected per file as they arrive and handed to
+    on_report(file, diagnostics) on the main thread.
+
+    A change made after a request was sent makes its remaining events
+    stale, they are dropped. tsserver itself abandons a geterr request when
+    a new one comes in.
+    """
+
+    def __init__(self, vim, client, get_files, on_report, delay=0.5):
+        self._vim = vim
+        self._client = client
+        self._get_files = get_files
+        self._on_report = on_report
+        self.delay = delay
+        self._timer = None
+        self._generation = 0
+        self._requested = None
+        self._lock = threading.Lock()
+        # file -> event name -> diagnostics
+        self._diagnostics = {}
+        for event in ERROR_EVENTS:
+            client.on_event(event, self._on_event)
+
+    def schedule(self):
+        """
+        (Re)start the debounce timer, cancelling the pending check
+        """
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(
+                self.delay, self._vim.async_call, [self._request])
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = None
+
+    def diagnostics(self, file):
+        """
+        The last diagnostics received for file, None if none were
+        """
+        with self._lock:
+            return self._collect(file)
+
+    def _collect(self, file):
+        events = self._diagnostics.get(file)
+        if events is None:
+            return None
+        return [d for event in ERROR_EVENTS for d in events.get(event, [])]
+
+    def _request(self):
+        files = self._get_files()
+        with self._lock:
+            self._timer = None
+            self._requested = self._generation
+        # each project's files go to the server that has them open
+        byRoot = {}
+        for file in files:
+            byRoot.setdefault(
+                self._client.project_root_for(file), []).append(file)
+        for group in byRoot.values():
+            self._client.send_command("geterr", {"files": group, "delay": 0})
+
+    def _on_event(self, message):
+        body = message.get("body") or {}
+        file = body.get("file")
+        if not file:
+            return
+        with self._lock:
+            if self._requested != self._generation:
+                return
+            events = self._diagnostics.setdefault(file, {})
+            events[message["event"]] = body.get("diagnostics", [])
+            diagnostics = self._collect(file)
+        self._vim.async_call(self._on_report, file, diagnostics)
+
+
+class ProjectDiagnostics(object):
+    """
+    Collects the diagnostics of a geterrForProject request.
+
+    on_chunk(items, checked, done) gets the quickfix items of every
+    `chunk` files as they are checked, with the count of checked files,
+    and once more with done set when the request completes, or after
+    `deadline` seconds. Nothing is reported once cancelled.
+
+    Only the events of the server of the project are collected, and each
+    file is counted once: the geterr of DiagnosticsService running at the
+    same time sends events for the same files.
+    """
+
+    def __init__(self, client, on_chunk, chunk=PROJECT_CHUNK_SIZE,
+                 deadline=PROJECT_DEADLINE_SECONDS):
+        self._client = client
+        self._on_chunk = on_chunk
+        self._chunk = chunk
+        self._deadline = deadline
+        self._timer = None
+        self._lock = threading.Lock()
+        self._pending = []
+        # file -> syntaxDiag items, until its semanticDiag comes
+        self._syntax = {}
+        self._counted = set()
+        self._unreported = 0
+        self.checked = 0
+        self.cancelled = False
+        self.finished = False
+        self.future = None
+
+    def start(self, file):
+        root = self._client.project_root_for(file)
+        for event in ERROR_EVENTS:
+            self._client.on_event(event, self._on_event, root)
+        self._timer = threading.Timer(self._deadline, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+        self.future = self._client.getErrForProject(file)
+        self.future.add_done_callback(self._done)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+        self._stop()
+        if self.future is not None:
+            self._client.cancel(self.future)
+
+    def _stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        for event in ERROR_EVENTS:
+            self._client.off_event(event, self._on_event)
+
+    def _on_event(self, message):
+        body = message.get("body") or {}
+        file = body.get("file")
+        if not file:
+            return
+        items = loclist_items(file, body.get("diagnostics", []))
+        with self._lock:
+            if self.cancelled or self.finished or file in self._counted:
+                return
+            # semanticDiag is the last event sent for a file
+            if message["event"] != "semanticDiag":
+                self._syntax[file] = items
+                return
+            self._counted.add(file)
+            self._pending.extend(self._syntax.pop(file, []) + items)
+            self.checked += 1
+            self._unreported += 1
+            if self._unreported >= self._chunk:
+                self._flush(False)
+
+    def _expire(self):
+        self._finish()
+        if self.future is not None:
+            self._client.cancel(self.future)
+
+    def _done(self, future):
+        self._finish()
+
+    def _finish(self):
+        self._stop()
+        with self._lock:
+            if self.cancelled or self.finished:
+                return
+            self.finished = True
+            for items in self._syntax.values():
+                self._pending.extend(items)
+            self._syntax.clear()
+            self._flush(True)
+
+    def _flush(self, done):
+        items, self._pending = self._pending, []
+        self._unreported = 0
+        self._on_chunk(items, self.checked, done)
@@ -1,29 +1,74 @@
 import os
-import sys
-from subprocess import check_output, CalledProcessError
 import logging
-from globster import Globster
+import threading
+from subprocess import check_output, CalledProcessError, DEVNULL
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from globster import ExceptionGlobster, TreeMatcher
 log = logging.getLogger("nvim-dir")
 
+EXCLUDES = ['.git/', '.hg/', '.svn/', 'node_modules']
+
+# directories listed at the same time by walk()
+WALK_THREADS = 8
+
+
+def load_patterns(exclude_file):
+    """
+    The patterns of a .gitignore file, without comments and blank lines
+    """
+    try:
+        with open(exclude_file) as f:
+            lines = f.read().split("\n")
+    except (OSError, UnicodeDecodeError):
+        return []
+    return [line for line in lines if line and not line.startswith('#')]
+
 
 class Dir(object):
+    """
+    The files of a project, minus the ignored ones.
 
-    def __init__(self):
-        excludes = ['.git/', '.hg/', '.svn/', 'node_modules']
-        self.directory = os.path.basename(self.getRootPath())
-        self.path = os.path.abspath(self.getRootPath())
+    Paths are matched relative to the root by the default excludes and the
+    root .gitignore, and relative to their own directory by any nested
+    .gitignore. A path ignored at some level stays ignored, a nested "!"
+    pattern only re-includes paths ignored by its own file.
+
+    In a git work tree, iterfiles() asks `git ls-files` instead of walking
+    the tree. Otherwise directories are listed with os.scandir, subtrees
+    in parallel.
+    """
+    # directory -> `git rev-parse --show-toplevel` from it, '.' outside git
+    __roots = {}
+    __lock = threading.Lock()
+
+    def __init__(self, path=None, use_git=True):
+        root = self.getRootPath(path)
+        self.git = use_git and root != '.'
+        if path is not None:
+            root = path
+        self.directory = os.path.basename(root)
+        self.path = os.path.abspath(root)
         self.parent = os.path.dirname(self.path)
         self.exclude_file = self.load_ignore()
-        self.patterns = excludes
+        self.patterns = list(EXCLUDES)
         if self.exclude_file is not None:
             self.patterns.extend(self.load_patterns(self.exclude_file))
-        self.globster = Globster(self.patterns)
+        self.globster = ExceptionGlobster(self.patterns, False)
 
-    def getRootPath(self):
+    def getRootPath(self, directory=None):
+        directory = os.path.abspath(directory or '.')
+        with Dir.__lock:
+            if directory in Dir.__roots:
+                return Dir.__roots[directory]
         try:
-            return check_output(["git", "rev-parse", "--show-toplevel"]).decode().strip('\n')
-        except CalledProcessError:
-            return '.'
+            root = check_output(["git", "rev-parse", "--show-toplevel"],
+                                cwd=directory, stderr=DEVNULL) \
+                .decode().strip('\n')
+        except (CalledProcessError, OSError):
+            root = '.'
+        with Dir.__lock:
+            Dir.__roots[directory] = root
+        return root
 
     def load_ignore(self):
         if os.path.isfile(os.path.join(self.path, '.gitignore')):
@@ -32,44 +77,112 @@ class Dir(object):
             return None
 
     def load_patterns(self, exclude_file):
-        res = []
-        ignore = filter(None, open(exclude_file).read().split("\n"))
-        for val in ignore:
-            if val.startswith('#'):
-                pass
-            else:
-                res.append(val)
-        return res
+        return load_patterns(exclude_file)
 
     def iterfiles(self):
-        for root, dirs, files in self.walk():
-            for f in files:
-                yield self.relpath(os.path.join(root, f))
+        files = self.git_files() if self.git else None
+        if files is None:
+            files = (rel + '/' + f if rel else f
+                     for rel, _, _, names in self._walk() for f in names)
+        for f in files:
+            yield f if os.sep == '/' else f.replace('/', os.sep)
 
     def files(self):
         return sorted(self.iterfiles())
 
+    def git_files(self):
+        """
+        The tracked and untracked files git doesn't ignore, minus the
+        default excludes and the tracked files deleted from the work tree.
+        None when git fails.
+        """
+        try:
+            # -t tags each path: H cached, R deleted, ? untracked
+            output = check_output(
+                ["git", "ls-files", "-z", "-t", "--cached", "--deleted",
+                 "--others", "--exclude-standard"],
+                cwd=self.path, stderr=DEVNULL)
+        except (CalledProcessError, OSError):
+            return None
+        entries = [(entry[:1], entry[2:]) for entry in
+                   output.decode('utf-8', 'replace').split('\0') if entry]
+        deleted = set(f for tag, f in entries if tag == 'R')
+        matcher = TreeMatcher(self.globster)
+        files = []
+        seen = set()
+        for tag, f in entries:
+            if tag == 'R' or f in seen or f in deleted:
+                continue
+            seen.add(f)
+            if not matcher.match(f):
+                files.append(f)
+        return files
+
     def is_excluded(self, path):
-        match = self.globster.match(self.relpath(path))
+        match = self.globster.match(self.relpath(path).replace(os.sep, '/'))
         if (match):
             return True
         return False
 
     def walk(self):
-        for root, dirs, files in os.walk(self.path, topdown=True):
-            ndirs = []
-            # First we exclude directories
-            for d in list(dirs):
-                if self.is_excluded(os.path.join(root, d)):
-                    dirs.remove(d)
-                elif not os.path.islink(os.path.join(root, d) + '/'):
-                    ndirs.append(d)
-
-            nfiles = []
-            for fpath in (os.path.join(root, f) for f in files):
-                if not self.is_excluded(fpath):
-                    nfiles.append(os.path.relpath(fpath, root))
-            yield root, ndirs, nfiles
+        """
+        Like os.walk, without the excluded directories and files. Subtrees
+        are listed in parallel, so directories come in no particular order.
+        """
+        for rel, path, dirs, files in self._walk():
+            yield path, dirs, files
+
+    def _walk(self):
+        with ThreadPoolExecutor(WALK_THREADS) as pool:
+            pending = set([pool.submit(
+                self._scan, self.path, '', [('', self.globster)])])
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, rel, dirs, files, matchers = future.result()
+                    for d in dirs:
+                        pending.add(pool.submit(
+                            self._scan, os.path.join(path, d),
+                            rel + '/' + d if rel else d, matchers))
+                    yield rel, path, dirs, files
+
+    def _scan(self, path, rel, matchers):
+        """
+        List one directory. Returns (path, rel, dirs, files, matchers),
+        matchers being the (base, globster) pairs its subdirectories go
+        through, with the directory's own .gitignore.
+        """
+        dirs = []
+        files = []
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return path, rel, dirs, files, matchers
+        if rel and any(e.name == '.gitignore' for e in entries):
+            patterns = load_patterns(os.path.join(path, '.gitignore'))
+            if patterns:
+                matchers = matchers + [
+                    (rel, ExceptionGlobster(patterns, False))]
+        for entry in entries:
+            child = rel + '/' + entry.name if rel else entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if self._ignored(child, matchers):
+                continue
+            if not is_dir:
+                files.append(entry.name)
+            elif not entry.is_symlink():
+                dirs.append(entry.name)
+        return path, rel, dirs, files, matchers
+
+    @staticmethod
+    def _ignored(rel, matchers):
+        for base, globster in matchers:
+            if globster.match(rel[len(base) + 1:] if base else rel):
+                return True
+        return False
 
     def relpath(self, path):
         return os.path.relpath(path, start=self.path)
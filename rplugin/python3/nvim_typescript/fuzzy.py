@@ -0,0 +1,171 @@
+from collections import defaultdict
+
+# score bonuses of a matched character
+BONUS_FIRST = 8
+BONUS_BOUNDARY = 6
+BONUS_CONSECUTIVE = 4
+PENALTY_GAP = 1
+
+
+def char_mask(text):
+    """
+    A bit per distinct character of text, so names missing one of the
+    query characters are skipped with a single and
+    """
+    mask = 0
+    for c in text:
+        mask |= 1 << (ord(c) & 63)
+    return mask
+
+
+def symbol_identity(symbol):
+    return (symbol['name'], symbol['file'],
+            symbol['start']['line'], symbol['start']['offset'])
+
+
+def trigrams(text):
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def is_boundary(name, i):
+    """
+    Whether name[i] starts a word: first character, after a separator or
+    an upper case letter after a lower case one (camelCase)
+    """
+    if i == 0:
+        return True
+    prev, c = name[i - 1], name[i]
+    return not prev.isalnum() or (c.isupper() and not prev.isupper())
+
+
+def match_positions(query, name, lower, boundaries=True):
+    """
+    Where the query characters are matched in name, None if they aren't
+    all found in order. With boundaries, a character not following the
+    previous match is taken from the next word start holding it if any.
+    """
+    positions = []
+    start = 0
+    for c in query:
+        found = lower.find(c, start)
+        if found < 0:
+            return None
+        if boundaries and not (positions and found == positions[-1] + 1):
+            i = found
+            while i >= 0 and not is_boundary(name, i):
+                i = lower.find(c, i + 1)
+            if i >= 0:
+                found = i
+        positions.append(found)
+        start = found + 1
+    return positions
+
+
+def fuzzy_score(query, name, lower=None):
+    """
+    Score of name for the lower case query, None when the query characters
+    don't all appear in name in order. Matches on word starts, consecutive
+    matches and short names rank higher.
+    """
+    lower = lower or name.lower()
+    positions = match_positions(query, name, lower) or \
+        match_positions(query, name, lower, False)
+    if positions is None:
+        return None
+
+    score = 0
+    for n, i in enumerate(positions):
+        if i == 0:
+            score += BONUS_FIRST
+        elif is_boundary(name, i):
+            score += BONUS_BOUNDARY
+        if n and i == positions[n - 1] + 1:
+            score += BONUS_CONSECUTIVE
+        elif n:
+            score -= PENALTY_GAP * min(i - positions[n - 1] - 1, 3)
+    if lower == query:
+        score += BONUS_FIRST * 2
+    return score * 100 - len(name)
+
+
+class FuzzyIndex(object):
+    """
+    Fuzzy matcher over symbol names (navto shaped dicts).
+
+    Names are prefiltered with a character mask; queries of three
+    characters or more first look at the trigram index, so names holding
+    the query as a substring are found without a scan. Symbols are added
+    and removed per file, so the index can be refreshed incrementally.
+    """
+
+    def __init__(self, symbols=()):
+        self._symbols = {}
+        self._files = defaultdict(set)
+        self._known = {}
+        self._trigrams = defaultdict(set)
+        self._next = 0
+        self.add(symbols)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def add(self, symbols):
+        """
+        Add symbols, the ones already known are skipped
+        """
+        for symbol in symbols:
+            identity = symbol_identity(symbol)
+            if identity in self._known:
+                continue
+            lower = symbol['name'].lower()
+            key = self._next
+            self._next += 1
+            self._symbols[key] = (symbol, lower, char_mask(lower))
+            self._known[identity] = key
+            self._files[symbol['file']].add(key)
+            for trigram in trigrams(lower):
+                self._trigrams[trigram].add(key)
+
+    def remove_file(self, file):
+        for key in self._files.pop(file, ()):
+            symbol, lower, mask = self._symbols.pop(key)
+            del self._known[symbol_identity(symbol)]
+            for trigram in trigrams(lower):
+                self._trigrams[trigram].discard(key)
+
+    def replace_file(self, file, symbols):
+        self.remove_file(file)
+        self.add(symbols)
+
+    def search(self, query, limit=100):
+        """
+        The symbols matching query, best first
+        """
+        query = query.lower()
+        if not query:
+            return []
+        keys = self._symbols
+        substrings = ()
+        if len(query) >= 3:
+            found = None
+            for trigram in trigrams(query):
+                found = self._trigrams.get(trigram, set()) if found is None \
+                    else found & self._trigrams.get(trigram, set())
+            substrings = set(k for k in found if query in self._symbols[k][1])
+            if len(substrings) >= limit:
+                # substring matches outrank any other fuzzy match
+                keys = substrings
+        mask = char_mask(query)
+        scored = []
+        for key in keys:
+            symbol, lower, symbolMask = self._symbols[key]
+            if symbolMask & mask != mask:
+                continue
+            score = fuzzy_score(query, symbol['name'], lower)
+            if score is None:
+                continue
+            if key in substrings:
+                score += BONUS_CONSECUTIVE * 100 * len(query)
+            scored.append((-score, symbol['name'], key))
+        scored.sort()
+        return [self._symbols[key][0] for _, _, key in scored[:limit]]
@@ -246,16 +246,14 @@ class Globster(object):
             for regex, patterns in self._regex_patterns:
                 match = regex.match(filename)
 
-                debug_template = "%s against %s: %%s" % (filename, regex._real_regex.pattern)
+                if self.debug:
+                    logger.info("%s against %s: %s" % (
+                        filename, regex._real_regex.pattern,
+                        "hit" if match else "miss"))
 
                 if match:
-                    if self.debug:
-                        logger.info(debug_template % "hit")
                     return patterns[match.lastindex -1]
 
-                if self.debug:
-                    logger.info(debug_template % "miss")
-
         except Exception as e:
             # We can't show the default e.msg to the user as thats for
             # the combined pattern we sent to regex. Instead we indicate to
@@ -307,6 +305,131 @@ class Globster(object):
         return result
 
 
+_wildcards = lazy_regex.lazy_compile(r'[*?[\\]')
+_canonical = lazy_regex.lazy_compile(r'(?:(?<=/)|^)(?:\.?/)+')
+
+
+class CompiledGlobster(object):
+    """A Globster answering literal patterns with hash lookups.
+
+    Extension patterns without wildcards ("*.log") are looked up by every
+    extension of the basename, basename patterns without wildcards
+    ("node_modules", "**/coverage") by the basename, and literal fullpath
+    patterns ("/dist") by the whole path. Only the remaining patterns go
+    through regexes: the extension and basename ones run on the basename
+    alone, the fullpath ones are skipped for paths that don't start with
+    the literal prefix of any of them ("src/gen/*.ts" only runs on paths
+    under src/gen/).
+
+    Matches the same filenames as a Globster of the same patterns.
+    """
+
+    def __init__(self, patterns, debug=False):
+        self.debug = debug
+        self._extensions = {}
+        self._basenames = {}
+        self._fullpaths = {}
+        extensions = []
+        basenames = []
+        paths = []
+        prefixes = []
+        for pat in patterns:
+            pat = normalize_pattern(pat)
+            kind = Globster.identify(pat)
+            if kind == "fullpath" and pat.startswith('**/') and \
+                    '/' not in pat[3:] and not _wildcards.search(pat[3:]):
+                # any file with that basename
+                self._basenames.setdefault(pat[3:], pat)
+                continue
+            if kind == "extension":
+                literal = pat[2:]
+                table = self._extensions
+            elif kind == "basename":
+                literal = pat
+                table = self._basenames
+            elif pat.startswith('RE:'):
+                paths.append(pat)
+                prefixes.append('')
+                continue
+            else:
+                literal = _canonical.sub('', pat)
+                table = self._fullpaths
+            wildcard = _wildcards.search(literal)
+            if wildcard is None:
+                table.setdefault(literal, pat)
+            elif kind == "fullpath":
+                paths.append(pat)
+                prefixes.append(literal[:wildcard.start()])
+            elif kind == "extension":
+                extensions.append(pat)
+            else:
+                basenames.append(pat)
+        # matched against the basename only
+        self._names = None
+        if extensions or basenames:
+            self._names = Globster([], debug)
+            self._names._add_patterns(extensions, _sub_extension, r'(?:.*\.)')
+            self._names._add_patterns(basenames, _sub_basename)
+        self._paths = Globster(paths, debug) if paths else None
+        self._prefixes = tuple(prefixes)
+
+    def match(self, filename):
+        """Searches for a pattern that matches the given filename.
+
+        :return A matching pattern or None if there is no matching pattern.
+        """
+        basename = filename[filename.rfind('/') + 1:]
+        pattern = None
+        if self._extensions:
+            dot = basename.find('.')
+            while dot >= 0 and pattern is None:
+                pattern = self._extensions.get(basename[dot + 1:])
+                dot = basename.find('.', dot + 1)
+        if pattern is None and self._basenames:
+            pattern = self._basenames.get(basename)
+        if pattern is None and self._fullpaths:
+            pattern = self._fullpaths.get(filename)
+        if pattern is not None:
+            if self.debug:
+                logger.info("%s against %s: hit" % (filename, pattern))
+            return pattern
+        if self._names is not None:
+            pattern = self._names.match(basename)
+        if pattern is None and self._paths is not None and \
+                filename.startswith(self._prefixes):
+            pattern = self._paths.match(filename)
+        return pattern
+
+
+class TreeMatcher(object):
+    """Matches the paths of a tree, remembering the verdict of directories.
+
+    A path under an ignored directory is ignored without being matched,
+    so a directory ruled out once prunes its whole subtree. Paths use '/'
+    and are relative to the root of the tree.
+    """
+
+    def __init__(self, globster):
+        self._globster = globster
+        self._dirs = {'': False}
+
+    def match_dir(self, dirname):
+        """Whether dirname or one of its parents is ignored."""
+        verdict = self._dirs.get(dirname)
+        if verdict is None:
+            parent = dirname[:max(dirname.rfind('/'), 0)]
+            verdict = self.match_dir(parent) or \
+                self._globster.match(dirname) is not None
+            self._dirs[dirname] = verdict
+        return verdict
+
+    def match(self, filename):
+        """Whether filename is ignored, itself or through a directory."""
+        dirname = filename[:max(filename.rfind('/'), 0)]
+        return self.match_dir(dirname) or \
+            self._globster.match(filename) is not None
+
+
 class ExceptionGlobster(object):
     """A Globster that supports exception patterns.
     
@@ -327,7 +450,7 @@ class ExceptionGlobster(object):
                 ignores[1].append(p[1:])
             else:
                 ignores[0].append(p)
-        self._ignores = [Globster(i, debug) for i in ignores]
+        self._ignores = [CompiledGlobster(i, debug) for i in ignores]
         
     def match(self, filename):
         """Searches for a pattern that matches the given filename.
@@ -0,0 +1,131 @@
+import os
+import re
+import json
+import threading
+from time import time
+
+CONFIG_FILES = ("tsconfig.json", "jsconfig.json")
+
+# seconds a cached root is used before checking the directories again
+VALIDATE_INTERVAL = 2
+
+_comments = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.S)
+_trailing_commas = re.compile(r'("(?:\\.|[^"\\])*")|,(\s*[}\]])')
+
+
+def find_config(directory):
+    for name in CONFIG_FILES:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def read_config(path):
+    """
+    Parse a tsconfig/jsconfig file, which may hold comments and trailing
+    commas. Returns {} when it can't be read.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        text = _comments.sub(lambda m: m.group(1) or '', text)
+        text = _trailing_commas.sub(lambda m: m.group(1) or m.group(2), text)
+        config = json.loads(text)
+    except (OSError, ValueError):
+        return {}
+    return config if isinstance(config, dict) else {}
+
+
+def referenced_projects(config):
+    """
+    The directories of the projects a config references
+    """
+    directory = os.path.dirname(config)
+    projects = []
+    for reference in read_config(config).get('references') or []:
+        if not isinstance(reference, dict) or 'path' not in reference:
+            continue
+        path = os.path.normpath(os.path.join(directory, reference['path']))
+        if path.endswith('.json'):
+            path = os.path.dirname(path)
+        projects.append(path)
+    return projects
+
+
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class ProjectRoots(object):
+    """
+    Memoised directory -> project root resolution.
+
+    The root of a directory is the closest one up the tree holding a
+    tsconfig.json or jsconfig.json. When that config references other
+    projects (a solution or composite project) and the directory lies in
+    one of them, the referenced project is the root instead.
+
+    A cached root is reused as is for `interval` seconds. Past that, the
+    modification times of the walked directories and of the config are
+    compared first, so a config created, deleted or edited is noticed
+    without probing for config files again.
+    """
+
+    def __init__(self, interval=VALIDATE_INTERVAL):
+        self.interval = interval
+        # directory -> (root, stamp, last check)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def root(self, directory):
+        """
+        The project root of directory, None outside of any project
+        """
+        directory = os.path.normpath(directory)
+        now = time()
+        with self._lock:
+            entry = self._entries.get(directory)
+        if entry is not None:
+            root, paths, stamp, checked = entry
+            if now - checked < self.interval:
+                return root
+            if [mtime(p) for p in paths] == stamp:
+                with self._lock:
+                    self._entries[directory] = (root, paths, stamp, now)
+                return root
+        root, paths = self._resolve(directory)
+        with self._lock:
+            self._entries[directory] = (
+                root, paths, [mtime(p) for p in paths], now)
+        return root
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _resolve(self, directory):
+        """
+        The root of directory, and the paths whose change can alter it
+        """
+        paths = []
+        current = directory
+        while True:
+            paths.append(current)
+            config = find_config(current)
+            if config is not None:
+                paths.append(config)
+                root = current
+                for project in referenced_projects(config):
+                    if (directory == project or
+                            directory.startswith(project + os.sep)) and \
+                            len(project) > len(root):
+                        root = project
+                return root, paths
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None, paths
+            current = parent
@@ -0,0 +1,74 @@
+import io
+from buffer_sync import utf16_len
+
+
+def utf16_index(text, offset):
+    """
+    The index in text of a 1-based tsserver offset, counted in UTF-16
+    code units
+    """
+    units = offset - 1
+    if utf16_len(text) == len(text):
+        return units
+    index = 0
+    while index < len(text) and units > 0:
+        units -= utf16_len(text[index])
+        index += 1
+    return index
+
+
+def edits_by_file(locs, newName):
+    """
+    Group the locations of a rename response by file, as
+    (start, end, text) edits with 1-based (line, offset) positions.
+    """
+    edits = {}
+    for loc in locs:
+        fileEdits = edits.setdefault(loc['file'], [])
+        for rename in loc['locs']:
+            fileEdits.append((
+                (rename['start']['line'], rename['start']['offset']),
+                (rename['end']['line'], rename['end']['offset']),
+                rename.get('prefixText', '') + newName +
+                rename.get('suffixText', '')))
+    return edits
+
+
+def apply_edits(lines, edits):
+    """
+    Apply the edits of one file to its lines, last edit first so the
+    positions of the others stay valid.
+
+    Returns (first, last, replacement): lines[first:last] of the original
+    lines are to be replaced by replacement, which covers only the lines
+    the edits touched.
+
+    :param lines: the file lines, left untouched
+    :param edits: (start, end, text) with 1-based (line, offset) positions
+    """
+    if not edits:
+        return 0, 0, []
+    edits = sorted(edits, reverse=True)
+    first = edits[-1][0][0] - 1
+    last = max(end[0] for start, end, text in edits)
+    replacement = lines[first:last]
+    for start, end, text in edits:
+        startLine = replacement[start[0] - 1 - first]
+        endLine = replacement[end[0] - 1 - first]
+        changed = (startLine[:utf16_index(startLine, start[1])] + text +
+                   endLine[utf16_index(endLine, end[1]):])
+        replacement[start[0] - 1 - first:end[0] - first] = changed.split('\n')
+    return first, last, replacement
+
+
+def rename_on_disk(file, edits):
+    """
+    Apply the edits to a file that isn't loaded in a buffer, with a single
+    read and write. Line endings are kept as they are.
+    """
+    with io.open(file, 'r', encoding='utf-8', newline='') as f:
+        lines = f.read().split('\n')
+    first, last, replacement = apply_edits(lines, edits)
+    lines[first:last] = replacement
+    with io.open(file, 'w', encoding='utf-8', newline='') as f:
+        f.write('\n'.join(lines))
@@ -0,0 +1,315 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from time import time
+from fuzzy import FuzzyIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    kindModifiers TEXT NOT NULL,
+    containerName TEXT NOT NULL,
+    file TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    endLine INTEGER NOT NULL,
+    endOffset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file);
+CREATE TABLE IF NOT EXISTS builds (
+    finished REAL NOT NULL
+);
+"""
+
+# bump when the schema or what gets indexed changes
+SCHEMA_VERSION = 3
+
+
+def index_path(root):
+    """
+    Where the index of the project at root is stored:
+    $XDG_CACHE_HOME/nvim-typescript/<hash of root>.sqlite
+    """
+    cache = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    name = hashlib.sha1(root.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache, 'nvim-typescript', name + '.sqlite')
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def project_source(file):
+    """
+    Whether file is worth indexing: dependencies (node_modules) and
+    declaration files, typescript's lib.d.ts included, aren't
+    """
+    return os.sep + 'node_modules' + os.sep not in file and \
+        not file.endswith('.d.ts')
+
+
+def merge_dependencies(symbols, navto):
+    """
+    The index symbols, plus the navto items of the files the index leaves
+    out (see project_source)
+    """
+    return symbols + [s for s in navto or [] if not project_source(s['file'])]
+
+
+def exported(item):
+    return 'export' in item.get('kindModifiers', '').split(',')
+
+
+def navtree_symbols(navtree):
+    """
+    The declarations of a navtree response worth indexing: the exported
+    top level items of the file and their exported direct children
+    (namespace members). Returned as (name, kind, kindModifiers,
+    containerName, line, offset, endLine, endOffset).
+    """
+    symbols = []
+
+    def add(item, container):
+        span = item['spans'][0]
+        symbols.append((item['text'], item['kind'],
+                        item.get('kindModifiers', ''), container,
+                        span['start']['line'], span['start']['offset'],
+                        span['end']['line'], span['end']['offset']))
+
+    for item in (navtree or {}).get('childItems', []):
+        if not exported(item):
+            continue
+        add(item, '')
+        for child in item.get('childItems', []):
+            if exported(child):
+                add(child, item['text'])
+    return symbols
+
+
+class SymbolIndex(object):
+    """
+    Persistent index of the exported declarations of a project's files,
+    answering
+    the symbol lookups of TSImport and TSSearch without tsserver.
+
+    It is stored in sqlite, one database per project root, so a previous
+    session's index is usable right away. Files are keyed by path, mtime
+    and content hash: build() only asks tsserver for the navtree of files
+    that changed since they were indexed.
+
+    Lookups return navto shaped dicts. fuzzy_search() goes through a
+    FuzzyIndex loaded on first use, which update() and remove() then keep
+    in step file by file.
+    """
+    __indexes = {}
+    __lock = threading.Lock()
+
+    @classmethod
+    def for_root(cls, root, path=None):
+        """
+        The shared index of the project at root
+        """
+        with cls.__lock:
+            if root not in cls.__indexes:
+                cls.__indexes[root] = cls(path or index_path(root))
+            return cls.__indexes[root]
+
+    def __init__(self, path):
+        self.path = path
+        self.building = False
+        self._fuzzy = None
+        self._lock = threading.Lock()
+        if path != ':memory:' and not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._db.executescript(
+                'DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS symbols; '
+                'DROP TABLE IF EXISTS builds;')
+            self._db.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def ready(self):
+        """
+        Whether a build of the whole project finished, in this session or
+        a previous one, and indexed anything. Until then the index only has
+        some of the files and can't replace navto.
+        """
+        with self._lock:
+            return self._db.execute(
+                'SELECT 1 FROM builds LIMIT 1').fetchone() is not None and \
+                self._db.execute(
+                    'SELECT 1 FROM files LIMIT 1').fetchone() is not None
+
+    def stale(self, file):
+        """
+        (mtime, hash) of file when its index entry is out of date, None
+        when it is current
+        """
+        try:
+            mtime = os.path.getmtime(file)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                'SELECT mtime, hash FROM files WHERE path = ?', (file,)).fetchone()
+        if row is not None and row[0] == mtime:
+            return None
+        digest = file_hash(file)
+        if row is not None and row[1] == digest:
+            # touched, not changed
+            with self._lock:
+                self._db.execute(
+                    'UPDATE files SET mtime = ? WHERE path = ?', (mtime, file))
+                self._db.commit()
+            return None
+        return mtime, digest
+
+    def update(self, file, mtime, digest, navtree):
+        """
+        Replace the symbols of file with the declarations of its navtree
+        """
+        rows = [s[:4] + (file,) + s[4:] for s in navtree_symbols(navtree)]
+        with self._lock:
+            self._db.execute('DELETE FROM symbols WHERE file = ?', (file,))
+            self._db.executemany(
+                'INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?)',
+                             (file, mtime, digest))
+            self._db.commit()
+            if self._fuzzy is not None:
+                self._fuzzy.replace_file(file, row_symbols(rows, ''))
+
+    def remove(self, files):
+        with self._lock:
+            for file in files:
+                self._db.execute('DELETE FROM symbols WHERE file = ?', (file,))
+                self._db.execute('DELETE FROM files WHERE path = ?', (file,))
+                if self._fuzzy is not None:
+                    self._fuzzy.remove_file(file)
+            self._db.commit()
+
+    def files(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute('SELECT path FROM files')]
+
+    def refresh(self, client, file):
+        """
+        Index file again if it changed, eg. after it was saved
+        """
+        state = self.stale(file)
+        if state is not None:
+            navtree = client.getDocumentSymbols(file)
+            if navtree:
+                self.update(file, state[0], state[1], navtree)
+
+    def build(self, client, file):
+        """
+        Bring the index of the project of file up to date in a background
+        thread, from the projectInfo file list
+        """
+        with self._lock:
+            if self.building:
+                return
+            self.building = True
+
+        def run():
+            try:
+                info = client.projectInfo(file, True)
+                if not info:
+                    return
+                files = [f for f in info.get('fileNames', [])
+                         if project_source(f)]
+                for f in files:
+                    self.refresh(client, f)
+                gone = set(self.files()) - set(files)
+                if gone:
+                    self.remove(gone)
+                with self._lock:
+                    self._db.execute('DELETE FROM builds')
+                    self._db.execute('INSERT INTO builds VALUES (?)', (time(),))
+                    self._db.commit()
+            finally:
+                with self._lock:
+                    self.building = False
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def lookup(self, name):
+        """
+        The declarations named name, case sensitive
+        """
+        return self._query('name = ? COLLATE NOCASE AND name = ?',
+                           (name, name), name)
+
+    def symbols(self):
+        """
+        Every declaration of the index
+        """
+        return self._query('1', (), '')
+
+    def search(self, term, limit=50):
+        """
+        The declarations whose name contains term, ignoring case; exact
+        matches first, then prefixes, shortest names first
+        """
+        pattern = term.replace('\\', '\\\\').replace('%', '\\%') \
+            .replace('_', '\\_')
+        return self._query(
+            "name LIKE ? ESCAPE '\\' ORDER BY name = ? COLLATE NOCASE DESC, "
+            "name LIKE ? ESCAPE '\\' DESC, length(name), name LIMIT ?",
+            ('%' + pattern + '%', term, pattern + '%', limit), term)
+
+    def fuzzy_search(self, query, limit=100):
+        """
+        The declarations fuzzy matching query, best first
+        """
+        with self._lock:
+            if self._fuzzy is None:
+                rows = self._db.execute('SELECT * FROM symbols').fetchall()
+                self._fuzzy = FuzzyIndex(row_symbols(rows, ''))
+            return self._fuzzy.search(query, limit)
+
+    def _query(self, where, args, term):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT * FROM symbols WHERE ' + where, args).fetchall()
+        return row_symbols(rows, term)
+
+
+def row_symbols(rows, term):
+    """
+    navto shaped dicts of symbols table rows, matchKind being relative
+    to term
+    """
+    lower = term.lower()
+    return [{
+        'name': name,
+        'kind': kind,
+        'kindModifiers': kindModifiers,
+        'containerName': containerName,
+        'file': file,
+        'start': {'line': line, 'offset': offset},
+        'end': {'line': endLine, 'offset': endOffset},
+        'matchKind': 'exact' if name.lower() == lower else
+        'prefix' if name.lower().startswith(lower) else 'substring'
+    } for (name, kind, kindModifiers, containerName, file,
+           line, offset, endLine, endOffset) in rows]
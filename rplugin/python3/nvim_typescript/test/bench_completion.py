@@ -0,0 +1,81 @@
+"""
+Micro-benchmark of the completion conversion over a 2,000 entry
+completionEntryDetails response.
+
+Run with `cd test && python3 bench_completion.py`
+"""
+import sys
+sys.path.append('..')
+import re
+import gzip
+import json
+import timeit
+import utils
+
+RESPONSE = './testData/benchmarks/completionEntryDetails.json.gz'
+SETTINGS = {
+    'nvim_typescript#kind_symbols': {
+        'method': 'method', 'property': 'prop', 'function': 'function',
+        'var': 'var', 'const': 'const', 'let': 'let', 'class': 'class',
+        'interface': 'interface', 'type': 'type', 'enum': 'enum',
+        'module': 'module', 'getter': 'getter', 'keyword': 'keyword',
+        'alias': 'alias'
+    },
+    'nvim_typescript#completion_mark': 'TS'
+}
+
+
+class FakeVim(object):
+    """
+    Stands in for neovim, the settings are plain dicts so only the Python
+    side of the conversion is measured
+    """
+    vars = SETTINGS
+
+    def eval(self, expr):
+        return SETTINGS
+
+
+def legacy_convert(entry, vim, isDeoplete=False):
+    """
+    The per entry conversion as it was before the batch API
+    """
+    signature = "".join([p["text"] for p in entry["displayParts"]])
+    signature = re.sub("\\s+", " ", signature)
+    menu_text = re.sub(
+        "^(var|let|const|class|\\(method\\)|\\(property\\)|enum|namespace|function|import|interface|type)\\s+", "", signature)
+    documentation = menu_text
+    if "documentation" in entry and entry["documentation"]:
+        documentation += "\n" + \
+            "".join([d["text"] for d in entry["documentation"]])
+    kinds = vim.vars["nvim_typescript#kind_symbols"]
+    kind = (kinds[entry['kind']] if entry['kind'] in kinds.keys() else entry['kind'])[0].title()
+    menu = menu_text if isDeoplete else '{0} {1}'.format(
+        vim.vars['nvim_typescript#completion_mark'], menu_text)
+    return {"word": entry["name"], "kind": '{} '.format(kind),
+            "menu": menu, "info": documentation}
+
+
+def main():
+    with gzip.open(RESPONSE, 'rt') as fd:
+        entries = json.load(fd)['body']
+    vim = FakeVim()
+    utils.getSettings(vim, reload=True)
+
+    assert [legacy_convert(e, vim) for e in entries] == \
+        utils.convert_completion_response(entries, vim, detailed=True)
+
+    runs = 20
+    cases = [
+        ('per entry (legacy)', lambda: [legacy_convert(e, vim) for e in entries]),
+        ('batch', lambda: utils.convert_completion_response(entries, vim, detailed=True)),
+        ('batch, plain', lambda: utils.convert_completion_response(entries, vim)),
+    ]
+    print('%d entries, best of %d runs' % (len(entries), runs))
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=runs))
+        print('  %-20s %8.2f ms' % (name, best * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark of the ignore matchers over the paths of a generated
+monorepo-like tree, with the patterns of a typical node project .gitignore.
+
+Run with `cd test && python3 bench_globster.py`
+"""
+import sys
+sys.path.append('..')
+import timeit
+from globster import Globster, CompiledGlobster, TreeMatcher
+
+# github/gitignore Node.gitignore, plus a few project specific entries
+GITIGNORE = """
+logs
+*.log
+npm-debug.log*
+yarn-debug.log*
+yarn-error.log*
+lerna-debug.log*
+report.[0-9]*.[0-9]*.[0-9]*.[0-9]*.json
+pids
+*.pid
+*.seed
+*.pid.lock
+lib-cov
+coverage
+*.lcov
+.nyc_output
+.grunt
+bower_components
+.lock-wscript
+build/Release
+node_modules/
+jspm_packages/
+typings/
+*.tsbuildinfo
+.npm
+.eslintcache
+.rpt2_cache/
+.rts2_cache_cjs/
+.node_repl_history
+*.tgz
+.yarn-integrity
+.env
+.env.test
+.cache
+.parcel-cache
+.next
+.nuxt
+dist
+.vuepress/dist
+.serverless/
+.fusebox/
+.dynamodb/
+.tern-port
+.vscode-test
+.DS_Store
+*.swp
+*~
+/tmp
+/packages/*/lib
+/packages/*/es
+**/__generated__
+src/**/*.generated.ts
+""".split("\n")
+
+EXCLUDES = ['.git/', '.hg/', '.svn/', 'node_modules']
+
+
+def tree_paths():
+    """
+    ~60k paths: packages with sources, tests, build output and logs
+    """
+    paths = []
+    for p in range(40):
+        package = 'packages/pkg%d' % p
+        for d in range(12):
+            for f in range(100):
+                paths.append('%s/src/module%d/file%d.ts' % (package, d, f))
+            paths.append('%s/src/module%d/__generated__/types.ts' % (package, d))
+            paths.append('%s/src/module%d/schema.generated.ts' % (package, d))
+        for f in range(20):
+            paths.append('%s/lib/file%d.js' % (package, f))
+            paths.append('%s/dist/file%d.js' % (package, f))
+            paths.append('%s/test/file%d.spec.ts' % (package, f))
+        paths.append('%s/npm-debug.log' % package)
+        paths.append('%s/coverage/lcov.info' % package)
+    return paths
+
+
+def main():
+    patterns = EXCLUDES + [p for p in GITIGNORE if p and not p.startswith('#')]
+    paths = tree_paths()
+    globster = Globster(patterns)
+    compiled = CompiledGlobster(patterns)
+
+    assert [globster.match(p) for p in paths] == \
+        [compiled.match(p) for p in paths]
+
+    def tree():
+        # a new TreeMatcher per run, so its directory cache starts empty
+        matcher = TreeMatcher(compiled)
+        return [matcher.match(p) for p in paths]
+
+    runs = 5
+    cases = [
+        ('Globster', lambda: [globster.match(p) for p in paths]),
+        ('CompiledGlobster', lambda: [compiled.match(p) for p in paths]),
+        ('TreeMatcher', tree),
+    ]
+    print('%d paths, %d patterns, best of %d runs' % (
+        len(paths), len(patterns), runs))
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=runs))
+        print('  %-20s %8.2f ms' % (name, best * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import sys
+sys.path.append('..')
+import unittest
+from unittest.mock import MagicMock
+from buffer_sync import BufferSync, OpenFiles, apply_lines_change
+
+
+def apply_ts_change(text, change):
+    """
+    Apply a tsserver change request the way the server does
+    """
+    def position(line, offset):
+        lines = text.split('\n')
+        before = sum(len(l) + 1 for l in lines[:line - 1])
+        units = lines[line - 1].encode('utf-16-le')[:(offset - 1) * 2]
+        return before + len(units.decode('utf-16-le'))
+    start = position(change['line'], change['offset'])
+    end = position(change['endLine'], change['endOffset'])
+    return text[:start] + change['insertString'] + text[end:]
+
+
+class TsBufferChangeTests(unittest.TestCase):
+    pass
+
+
+# name, lines, firstline, lastline, linedata
+bufferChangeTests = [
+    ['editLine', ['a', 'b', 'c'], 1, 2, ['bb']],
+    ['insertLines', ['a', 'b', 'c'], 1, 1, ['x', 'y']],
+    ['deleteMiddleLines', ['a', 'b', 'c', 'd'], 1, 3, []],
+    ['editLastLine', ['a', 'b', 'c'], 2, 3, ['cc']],
+    ['appendAtEnd', ['a', 'b'], 2, 2, ['c', 'd']],
+    ['deleteLastLines', ['a', 'b', 'c'], 1, 3, []],
+    ['replaceAll', ['a', 'b'], 0, 2, ['x']],
+    ['deleteAll', ['a', 'b'], 0, 2, ['']],
+    ['singleLineBuffer', ['a'], 0, 1, ['ab']],
+    ['wideCharacters', ['\U0001F600 a', 'café'], 1, 2, []],
+]
+
+
+def generateBufferChangeTest(lines, firstline, lastline, linedata):
+    def test(self):
+        mirror = list(lines)
+        change = apply_lines_change(mirror, firstline, lastline, linedata)
+        expected = lines[:firstline] + linedata + lines[lastline:]
+        self.assertEqual(mirror, expected)
+        self.assertEqual(apply_ts_change('\n'.join(lines), change),
+                         '\n'.join(expected))
+    return test
+
+
+for test in bufferChangeTests:
+    setattr(TsBufferChangeTests, 'test_%s' % test[0],
+            generateBufferChangeTest(*test[1:]))
+
+class TsBufferTickTests(unittest.TestCase):
+    def test_skipsUnchangedBuffer(self):
+        client = MagicMock()
+        client.reload = MagicMock(return_value=True)
+        sync = BufferSync(client)
+        self.assertFalse(sync.is_synced(1001, 5))
+        sync.reload('a.ts', 'let a = 1', 1001, 5)
+        self.assertTrue(sync.is_synced(1001, 5))
+        self.assertFalse(sync.is_synced(1001, 6))
+        self.assertFalse(sync.is_synced(1001))
+
+    def test_failedReloadIsNotRemembered(self):
+        client = MagicMock()
+        client.reload = MagicMock(return_value=False)
+        sync = BufferSync(client)
+        sync.reload('a.ts', 'let a = 1', 1002, 5)
+        self.assertFalse(sync.is_synced(1002, 5))
+
+
+class TsOpenFilesTests(unittest.TestCase):
+    def test_closedFileOnlyUpdatesTheMirror(self):
+        client = MagicMock()
+        client.is_open = MagicMock(return_value=False)
+        sync = BufferSync(client)
+        vim = MagicMock()
+        vim.api.buf_attach = MagicMock(return_value=True)
+        buffer = MagicMock(number=1003)
+        buffer.name = 'c.ts'
+        sync.attach(vim, buffer)
+        sync.on_lines(1003, 1, 0, -1, ['a', 'b'])
+        sync.on_lines(1003, 2, 1, 2, ['bb'])
+        self.assertFalse(client.reload.called)
+        self.assertFalse(client.change.called)
+        self.assertTrue(sync.is_synced(1003))
+        sync.detach(1003)
+
+    def test_hiddenAfterTimeout(self):
+        files = OpenFiles()
+        files.shown(['a.ts', 'b.ts'], 0)
+        self.assertEqual(files.hidden(['a.ts', 'b.ts'], ['a.ts'], 10, 5), [])
+        self.assertEqual(files.hidden(['a.ts', 'b.ts'], ['a.ts'], 10, 12), ['b.ts'])
+        # shown again after being closed, it starts over
+        self.assertEqual(files.hidden(['a.ts', 'b.ts'], [], 10, 13), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,12 @@ from unittest import mock
 import utils
 import json
 import glob
-from client import Client
+import io
+import shutil
+import tempfile
+import os
+import time
+from client import Client, ServerPool, Timeout, read_message, get_response_body, server_command
 from os import getcwd
 
 class TsFindTsConfigTests(unittest.TestCase):
@@ -37,3 +42,320 @@ class TsFindTsConfigTests(unittest.TestCase):
         clientInstance = Client()
         projectRoot = clientInstance.project_cwd(mock_os_cwd)
         self.assertFalse(projectRoot)
+
+
+def frame(body):
+    data = body.encode('utf-8')
+    return b'Content-Length: %d\r\n\r\n' % len(data) + data
+
+
+class TsReadMessageTests(unittest.TestCase):
+    def test_readsExactlyContentLength(self):
+        stream = io.BytesIO(frame('{"text": "caf\u00e9 \\n \u2603"}\n') + frame('{"seq": 2}\n'))
+        self.assertEqual(read_message(stream), {'text': 'caf\u00e9 \n \u2603'})
+        self.assertEqual(read_message(stream), {'seq': 2})
+        self.assertIsNone(read_message(stream))
+
+    def test_multilineBody(self):
+        stream = io.BytesIO(b'\r\n' + frame('{\n"seq":\n 1\n}'))
+        self.assertEqual(read_message(stream), {'seq': 1})
+
+    def test_truncatedBody(self):
+        stream = io.BytesIO(frame('{"seq": 1}')[:-3])
+        self.assertIsNone(read_message(stream))
+
+
+class TsClientTransportTests(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.client.serverPath = '%s/testData/fakeServer/tsserver' % getcwd()
+        self.client.start()
+
+    def tearDown(self):
+        self.client.stop()
+
+    def test_pipelinedRequests(self):
+        slow = self.client.send_request_async('quickinfo', {'sleep': 0.3})
+        fast = self.client.send_request_async('completions', {'sleep': 0})
+        self.assertEqual(self.client.wait(fast, 5)['command'], 'completions')
+        self.assertFalse(slow.done())
+        self.assertEqual(self.client.wait(slow, 5)['command'], 'quickinfo')
+
+    def test_deadline(self):
+        response = self.client.send_request('references', {'sleep': 1}, timeout=0.05)
+        self.assertIsInstance(response, Timeout)
+        self.assertFalse(response['success'])
+        self.assertEqual(get_response_body(response), [])
+        self.assertEqual(self.client.send_request('definition', {'file': 'a.ts'}, timeout=5)['body'], {'file': 'a.ts'})
+
+    def test_sharedInstance(self):
+        self.assertIs(Client.instance(), Client.instance())
+
+    def test_identicalReadsAreCoalesced(self):
+        args = {'file': 'a.ts', 'line': 1, 'offset': 1, 'sleep': 0.2}
+        first = self.client.send_request_async('navtree', args)
+        second = Client().send_request_async('navtree', dict(args))
+        self.assertIs(first, second)
+        # a change in between makes the next one a new request
+        self.client.send_command('change', {'file': 'a.ts'})
+        third = self.client.send_request_async('navtree', args)
+        self.assertIsNot(first, third)
+        # one caller giving up doesn't drop the response for the other
+        self.assertIsInstance(self.client.wait(first, 0.01), Timeout)
+        self.assertEqual(self.client.wait(second, 5)['body'], args)
+
+    def test_generationMovesOnChanges(self):
+        generation = self.client.generation()
+        self.client.send_request('quickinfo', {'file': 'a.ts', 'line': 1}, timeout=5)
+        self.assertEqual(self.client.generation(), generation)
+        self.client.send_command('change', {'file': 'b.ts'})
+        self.assertGreater(self.client.generation(), generation)
+        generation = self.client.generation()
+        self.client.saved('b.ts')
+        self.assertGreater(self.client.generation(), generation)
+
+    def test_retryAfterTimeout(self):
+        args = {'file': 'a.ts', 'line': 1, 'offset': 1, 'sleep': 0.2}
+        self.assertIsInstance(self.client.send_request('definition', args, timeout=0), Timeout)
+        self.assertEqual(self.client.send_request('definition', dict(args), timeout=2)['body'], args)
+
+    def test_supersededRequestIsCancelled(self):
+        first = self.client.send_request_async('completions', {'file': 'a.ts', 'sleep': 0.3})
+        second = self.client.send_request_async('completions', {'file': 'a.ts', 'sleep': 0})
+        self.assertIsNone(self.client.wait(first, 0.1))
+        self.assertEqual(self.client.wait(second, 5)['body']['file'], 'a.ts')
+        pipe = first.server.cancellation_dir
+        self.assertTrue(os.path.exists(os.path.join(pipe, 'cancel{}'.format(first.seq))))
+        # the canceled response cleans the cancellation file up
+        time.sleep(0.5)
+        self.assertEqual(os.listdir(pipe), [])
+
+    def test_cancelAfterResponse(self):
+        future = self.client.send_request_async('references', {'file': 'a.ts'})
+        self.assertEqual(self.client.wait(future, 5)['body'], {'file': 'a.ts'})
+        future.server.cancel(future.seq)
+        self.assertEqual(os.listdir(future.server.cancellation_dir), [])
+        self.assertEqual(future.server.cancelled, set())
+
+    def test_cancelSharedRequest(self):
+        args = {'file': 'a.ts', 'sleep': 0.2}
+        first = self.client.send_request_async('semanticDiagnosticsSync', args)
+        second = self.client.send_request_async('semanticDiagnosticsSync', dict(args))
+        self.client.cancel(first)
+        self.assertEqual(self.client.wait(second, 5)['body'], [])
+        self.assertEqual(os.listdir(second.server.cancellation_dir), [])
+
+    def test_supersededPerFileAndOrigin(self):
+        args = {'file': 'a.ts', 'sleep': 0.2}
+        deoplete = self.client.send_request_async('completions', args, 'deoplete')
+        denite = self.client.send_request_async('completions', dict(args), 'denite')
+        other = self.client.send_request_async('completions', {'file': 'b.ts', 'sleep': 0.2}, 'deoplete')
+        self.assertEqual(self.client.wait(deoplete, 5)['body'], args)
+        self.assertEqual(self.client.wait(denite, 5)['body'], args)
+        self.assertEqual(self.client.wait(other, 5)['body']['file'], 'b.ts')
+
+    def test_sharedRequestIsNotSuperseded(self):
+        args = {'file': 'a.ts', 'line': 1, 'sleep': 0.2}
+        first = self.client.send_request_async('quickinfo', args)
+        shared = self.client.send_request_async('quickinfo', dict(args))
+        self.assertIs(first, shared)
+        self.client.send_request_async('quickinfo', {'file': 'a.ts', 'line': 2})
+        self.assertEqual(self.client.wait(shared, 5)['body'], args)
+
+    def test_crashedServerIsRestarted(self):
+        crashed = self.client.send_request_async('definition', {'file': 'a.ts'}).server
+        self.client.send_command('exit', {'file': 'a.ts'})
+        time.sleep(0.5)
+        servers = self.client.server_handle.servers()
+        self.assertEqual(len(servers), 1)
+        self.assertIsNot(servers[0], crashed)
+        self.assertTrue(servers[0].alive())
+
+    def test_restartIsScheduled(self):
+        scheduled = []
+        self.client.schedule_with(lambda fn, *args: scheduled.append((fn, args)))
+        try:
+            crashed = self.client.send_request_async('definition', {'file': 'a.ts'}).server
+            self.client.send_command('exit', {'file': 'a.ts'})
+            crashed.handle.wait(5)
+            time.sleep(0.2)
+            # nothing happens on the reader thread
+            self.assertEqual(len(scheduled), 1)
+            self.assertEqual(self.client.server_handle.servers(), [crashed])
+            fn, args = scheduled[0]
+            fn(*args)
+            servers = self.client.server_handle.servers()
+            self.assertIsNot(servers[0], crashed)
+            self.assertTrue(servers[0].alive())
+        finally:
+            self.client.schedule_with(None)
+
+    def test_updateOpenSendsStateChanges(self):
+        try:
+            self.assertEqual(self.client.update_open({'a.ts': 'let a', 'b.ts': None}),
+                             (['a.ts', 'b.ts'], []))
+            # a.ts is already open, b.ts gets closed in the same request
+            self.assertEqual(self.client.update_open({'a.ts': 'let a'}, ['b.ts', 'c.ts']),
+                             ([], ['b.ts']))
+            self.assertTrue(self.client.is_open('a.ts'))
+            self.assertFalse(self.client.is_open('b.ts'))
+        finally:
+            self.client.update_open(closed=list(self.client.open_files()))
+
+    def test_getErr(self):
+        self.assertEqual(self.client.getErr(['a.ts'], timeout=5),
+                         {'file': 'a.ts', 'diagnostics': []})
+
+    def test_diagnosticsSync(self):
+        self.assertEqual(self.client.diagnosticsSync('a.ts'), [])
+        # semantic diagnostics are skipped on syntax errors
+        self.assertEqual(len(self.client.diagnosticsSync('b.ts')), 1)
+
+    def test_diagnosticsSyncWithoutServer(self):
+        self.client.stop()
+        self.assertIsNone(self.client.diagnosticsSync('a.ts'))
+
+
+class TsServerPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.client.serverPath = '%s/testData/fakeServer/tsserver' % getcwd()
+        self.projectFile = '%s/testData/fakeRepo/src/module/file.ts' % getcwd()
+
+    def tearDown(self):
+        self.client.stop()
+        Client.max_servers = 4
+        Client.max_old_space_size = 3072
+        Client.standby = False
+
+    def test_serverPerProject(self):
+        self.client.start()
+        inProject = self.client.send_request('quickinfo', {'file': self.projectFile}, timeout=5)
+        outside = self.client.send_request('quickinfo', {'file': '/random/no/dir/file.ts'}, timeout=5)
+        self.assertEqual(inProject['cwd'], '%s/testData/fakeRepo' % getcwd())
+        self.assertEqual(outside['cwd'], getcwd())
+        self.assertEqual(len(self.client.server_handle.servers()), 2)
+
+    def test_evictsLeastRecentlyUsed(self):
+        Client.max_servers = 1
+        self.client.start()
+        self.client.send_request('quickinfo', {'file': self.projectFile}, timeout=5)
+        first = self.client.server_handle.servers()[0]
+        self.client.send_request('quickinfo', {'file': '/random/no/dir/file.ts'}, timeout=5)
+        servers = self.client.server_handle.servers()
+        self.assertEqual(len(servers), 1)
+        self.assertEqual(servers[0].root, getcwd())
+        first.handle.wait(5)
+        self.assertFalse(first.alive())
+
+    def test_maxServersSetting(self):
+        vim = mock.MagicMock()
+        vim.eval = mock.MagicMock(return_value={
+            'nvim_typescript#server_path': self.client.serverPath,
+            'nvim_typescript#max_servers': 1})
+        Client().configure(utils.getSettings(vim, reload=True))
+        self.client.start()
+        self.assertEqual(self.client.server_handle.max_servers, 1)
+        self.client.send_request('quickinfo', {'file': self.projectFile}, timeout=5)
+        self.client.send_request('quickinfo', {'file': '/random/no/dir/file.ts'}, timeout=5)
+        self.assertEqual(len(self.client.server_handle.servers()), 1)
+
+    def test_serverSettings(self):
+        vim = mock.MagicMock()
+        vim.eval = mock.MagicMock(return_value={
+            'nvim_typescript#server_path': self.client.serverPath,
+            'nvim_typescript#max_old_space_size': 2048,
+            'nvim_typescript#standby_server': 1})
+        Client().configure(utils.getSettings(vim, reload=True))
+        self.client.start()
+        self.assertTrue(self.client.server_handle.standby)
+        self.assertEqual(Client.max_old_space_size, 2048)
+        self.client.send_request('quickinfo', {'file': self.projectFile}, timeout=5)
+        self.assertEqual(len(self.client.server_handle.servers()), 1)
+
+
+class TsServerSpawnTests(unittest.TestCase):
+    def setUp(self):
+        self.log = mock.MagicMock()
+        self.client = Client(log_fn=self.log)
+        self.client.start()
+
+    def tearDown(self):
+        self.client.stop()
+
+    def cancellation_dirs(self):
+        return set(glob.glob(os.path.join(tempfile.gettempdir(), 'nvim-typescript-*')))
+
+    @mock.patch('client.server_command', return_value=['/no/such/tsserver'])
+    def test_missingServer(self, server_command):
+        before = self.cancellation_dirs()
+        self.assertIsNone(self.client.send_request('quickinfo', {'file': 'a.ts'}, timeout=5))
+        self.assertIsNone(self.client.send_request('quickinfo', {'file': 'a.ts'}, timeout=5))
+        self.assertEqual(self.log.call_count, 1)
+        self.assertIn('/no/such/tsserver', self.log.call_args[0][0])
+        self.assertEqual(self.client.server_handle.servers(), [])
+        self.assertEqual(self.cancellation_dirs(), before)
+
+
+class TsServerCommandTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.dir, 'node_modules', '.bin'))
+        os.makedirs(os.path.join(self.dir, 'node_modules', 'typescript', 'bin'))
+        os.makedirs(os.path.join(self.dir, 'node_modules', 'typescript', 'lib'))
+        self.script = os.path.join(self.dir, 'node_modules', 'typescript', 'lib', 'tsserver.js')
+        open(self.script, 'w').close()
+        open(os.path.join(self.dir, 'node_modules', 'typescript', 'bin', 'tsserver'), 'w').close()
+        self.bin = os.path.join(self.dir, 'node_modules', '.bin', 'tsserver')
+        os.symlink('../typescript/bin/tsserver', self.bin)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    @mock.patch('shutil.which', return_value='/usr/bin/node')
+    def test_nodeRunsTheScript(self, which):
+        self.assertEqual(server_command(self.bin, 2048),
+                         ['/usr/bin/node', '--max-old-space-size=2048', os.path.realpath(self.script)])
+        self.assertEqual(server_command(self.bin), ['/usr/bin/node', os.path.realpath(self.script)])
+
+    @mock.patch('shutil.which', return_value=None)
+    def test_withoutNode(self, which):
+        self.assertEqual(server_command(self.bin),
+                         [os.path.join(os.path.realpath(self.dir), 'node_modules', 'typescript', 'bin', 'tsserver')])
+        self.assertEqual(server_command('tsserver'), ['tsserver'])
+
+
+class TsStandbyTests(unittest.TestCase):
+    def setUp(self):
+        self.spawned = []
+        self.pool = ServerPool(self.spawn, standby=True)
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def spawn(self, root):
+        server = mock.MagicMock()
+        server.root = root
+        server.alive.return_value = True
+        self.spawned.append(server)
+        return server
+
+    def test_deadServerIsKilled(self):
+        server, spawned = self.pool.get('/project')
+        server.alive.return_value = False
+        self.assertEqual(self.pool.get('/project'), (self.spawned[2], True))
+        server.kill.assert_called_once_with()
+
+    def test_spawnFailure(self):
+        pool = ServerPool(lambda root: None, standby=True)
+        self.assertEqual(pool.get('/project'), (None, False))
+        self.assertEqual(pool.servers(), [])
+
+    def test_restartPromotesTheStandby(self):
+        server, spawned = self.pool.get('/project')
+        self.assertEqual(len(self.spawned), 2)
+        self.assertEqual(self.pool.restart(), ['/project'])
+        server.kill.assert_called_once_with()
+        self.assertEqual(self.pool.get('/project'), (self.spawned[1], False))
+        # a new standby is started behind it
+        self.assertEqual(len(self.spawned), 3)
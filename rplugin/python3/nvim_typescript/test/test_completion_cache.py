@@ -0,0 +1,85 @@
+import sys
+sys.path.append('..')
+import unittest
+from unittest.mock import MagicMock
+from completion_cache import CompletionCache, DetailCache
+
+
+def entries(*names):
+    return [{'name': n, 'kind': 'var'} for n in names]
+
+
+class TsCompletionCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = CompletionCache()
+        self.key = ('a.ts', 1, 3, 4, '    ')
+
+    def test_narrowsFilteredResponse(self):
+        self.cache.put(self.key, 'fo', entries('foo', 'Foobar', 'fork'))
+        self.assertEqual(self.cache.get(self.key, 'foo'), entries('foo', 'Foobar'))
+        self.assertEqual(self.cache.get(self.key, 'fo'), entries('foo', 'Foobar', 'fork'))
+
+    def test_keepsMemberCompletions(self):
+        self.cache.put(self.key, 'ba', entries('foo', 'bar'))
+        self.assertEqual(self.cache.get(self.key, 'bar'), entries('foo', 'bar'))
+        self.cache.put(self.key, '', entries('foo', 'bar'))
+        self.assertEqual(self.cache.get(self.key, 'b'), entries('foo', 'bar'))
+
+    def test_misses(self):
+        self.cache.put(self.key, 'fo', entries('foo'))
+        self.assertIsNone(self.cache.get(self.key, 'f'))
+        self.assertIsNone(self.cache.get(self.key, 'ba'))
+        self.assertIsNone(self.cache.get(('a.ts', 1, 4, 4, '    '), 'foo'))
+        # the file changed somewhere else
+        self.assertIsNone(self.cache.get(('a.ts', 2, 3, 4, '    '), 'foo'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(self.key, 'foo'))
+
+
+def serverDetails(file, line, offset, names):
+    return [{'name': n if isinstance(n, str) else n['name'], 'kind': 'var',
+             'displayParts': []}
+            for n in names if n != 'unknown']
+
+
+class TsDetailCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = DetailCache(size=3)
+        self.cache.clear()
+        self.client = MagicMock()
+        self.client.completion_entry_details = MagicMock(side_effect=serverDetails)
+
+    def test_onlyAsksForMissingNames(self):
+        self.cache.details(self.client, 'a.ts', 1, 1, entries('foo', 'bar'), 0)
+        details = self.cache.details(self.client, 'a.ts', 1, 1, entries('bar', 'baz'), 0)
+        self.assertEqual([d['name'] for d in details], ['bar', 'baz'])
+        self.client.completion_entry_details.assert_called_with('a.ts', 1, 1, ['baz'])
+
+    def test_generationInvalidates(self):
+        self.cache.details(self.client, 'a.ts', 1, 1, entries('foo'), 0)
+        self.cache.details(self.client, 'a.ts', 1, 1, entries('foo'), 1)
+        self.assertEqual(self.client.completion_entry_details.call_count, 2)
+
+    def test_sourceAndUnresolvedEntries(self):
+        withSource = [{'name': 'foo', 'kind': 'var', 'source': '/lib.ts'},
+                      {'name': 'unknown', 'kind': 'var'},
+                      {'name': 'bar', 'kind': 'var'}]
+        details = self.cache.details(self.client, 'a.ts', 1, 1, withSource, 0)
+        self.assertEqual([d['name'] for d in details], ['foo', 'bar'])
+        self.client.completion_entry_details.assert_called_with(
+            'a.ts', 1, 1, [{'name': 'foo', 'source': '/lib.ts'}, 'unknown', 'bar'])
+
+    def test_rememberedSessionDetail(self):
+        self.cache.remember('a.ts', 2, 5, entries('foo', 'bar'), 0)
+        self.assertEqual(self.cache.detail(self.client, 'bar')['name'], 'bar')
+        self.client.completion_entry_details.assert_called_with('a.ts', 2, 5, ['bar'])
+        self.assertIsNone(self.cache.detail(self.client, 'baz'))
+
+    def test_boundedSize(self):
+        self.cache.details(self.client, 'a.ts', 1, 1, entries('a', 'b', 'c', 'd'), 0)
+        self.cache.details(self.client, 'a.ts', 1, 1, entries('a'), 0)
+        self.client.completion_entry_details.assert_called_with('a.ts', 1, 1, ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import sys
+import time
+import threading
+sys.path.append('..')
+import unittest
+from unittest.mock import MagicMock
+from os import getcwd
+from concurrent.futures import Future
+from client import Client
+import diagnostics
+
+
+def error(line, col, endLine, endCol, filename='a.ts'):
+    return {'filename': filename, 'lnum': line, 'col': col,
+            'end': {'line': endLine, 'offset': endCol}, 'text': 'error'}
+
+
+class TsHighlightTests(unittest.TestCase):
+    def test_highlightsFor(self):
+        errors = [error(1, 2, 1, 5), error(3, 1, 4, 2), error(1, 1, 1, 2, 'b.ts')]
+        self.assertEqual(diagnostics.highlights_for(errors, 'a.ts'),
+                         set([('ERROR', 0, 1, 4), ('ERROR', 2, 0, -1)]))
+
+    def test_firstApplyClearsEverything(self):
+        current = set([('ERROR', 4, 0, 3)])
+        self.assertEqual(diagnostics.highlight_calls('buf', 7, None, current), [
+            ['nvim_buf_clear_highlight', ['buf', 7, 0, -1]],
+            ['nvim_buf_add_highlight', ['buf', 7, 'ERROR', 4, 0, 3]]])
+
+    def test_onlyChangedLinesAreTouched(self):
+        previous = set([('ERROR', 1, 0, 3), ('ERROR', 5, 0, 3), ('ERROR', 6, 2, 4)])
+        current = set([('ERROR', 1, 0, 3), ('ERROR', 6, 2, 4), ('ERROR', 6, 8, 9), ('ERROR', 7, 0, 1)])
+        self.assertEqual(diagnostics.highlight_calls('buf', 7, previous, current), [
+            ['nvim_buf_clear_highlight', ['buf', 7, 5, 8]],
+            ['nvim_buf_add_highlight', ['buf', 7, 'ERROR', 6, 2, 4]],
+            ['nvim_buf_add_highlight', ['buf', 7, 'ERROR', 6, 8, 9]],
+            ['nvim_buf_add_highlight', ['buf', 7, 'ERROR', 7, 0, 1]]])
+
+    def test_unchanged(self):
+        same = set([('ERROR', 1, 0, 3)])
+        self.assertEqual(diagnostics.highlight_calls('buf', 7, same, set(same)), [])
+
+
+class TsDiagnosticsCacheTests(unittest.TestCase):
+    def test_versioned(self):
+        cache = diagnostics.DiagnosticsCache()
+        cache.put('a.ts', 3, [])
+        self.assertEqual(cache.get('a.ts', 3), [])
+        self.assertIsNone(cache.get('a.ts', 4))
+        cache.clear()
+        self.assertIsNone(cache.get('a.ts', 3))
+
+
+class FakeVim(object):
+    def async_call(self, fn, *args):
+        fn(*args)
+
+
+class TsDiagnosticsServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.client.serverPath = '%s/testData/fakeServer/tsserver' % getcwd()
+        self.client.start()
+        self.requested = []
+        self.reports = []
+        self.visible = ['a.ts']
+        self.service = diagnostics.DiagnosticsService(
+            FakeVim(), self.client, self.files, self.report, delay=0.05)
+
+    def tearDown(self):
+        self.client.stop()
+
+    def files(self):
+        self.requested.append(self.visible)
+        return self.visible
+
+    def report(self, file, errors):
+        self.reports.append((file, errors))
+
+    def test_debouncedRequest(self):
+        done = self.client.wait_for_event('semanticDiag')
+        for _ in range(3):
+            self.service.schedule()
+        self.client.wait(done, 5)
+        time.sleep(0.1)
+        self.assertEqual(self.requested, [['a.ts']])
+        self.assertEqual(self.reports[-1], ('a.ts', []))
+        self.assertEqual(self.service.diagnostics('a.ts'), [])
+        self.assertIsNone(self.service.diagnostics('b.ts'))
+
+    def test_requestPerProject(self):
+        projectFile = '%s/testData/fakeRepo/src/module/file.ts' % getcwd()
+        self.visible = ['a.ts', projectFile]
+        done = self.client.wait_for_event('semanticDiag')
+        self.service.schedule()
+        self.client.wait(done, 5)
+        time.sleep(0.1)
+        self.assertEqual(len(self.client.server_handle.servers()), 2)
+        self.assertEqual(set(f for f, _ in self.reports), set(self.visible))
+
+    def test_suggestionsAreNotErrors(self):
+        client = MagicMock()
+        diagnostics.DiagnosticsService(FakeVim(), client, self.files, self.report)
+        self.assertEqual([c[0][0] for c in client.on_event.call_args_list],
+                         ['syntaxDiag', 'semanticDiag'])
+
+
+class TsProjectDiagnosticsTests(unittest.TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.client.serverPath = '%s/testData/fakeServer/tsserver' % getcwd()
+        self.client.start()
+        self.chunks = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.client.stop()
+
+    def on_chunk(self, items, checked, done):
+        self.chunks.append(([i['filename'] for i in items], checked, done))
+        if done:
+            self.done.set()
+
+    def test_streamedChunks(self):
+        run = diagnostics.ProjectDiagnostics(self.client, self.on_chunk, chunk=1)
+        run.start('a.ts')
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.chunks, [([], 1, False), (['b.ts'], 2, False),
+                                       ([], 2, True)])
+
+    def test_backgroundGeterrIsIgnored(self):
+        projectFile = '%s/testData/fakeRepo/src/module/file.ts' % getcwd()
+        run = diagnostics.ProjectDiagnostics(self.client, self.on_chunk)
+        # the same files from the background check, and another project
+        self.client.send_request_async('geterr', {'files': ['b.ts', 'a.ts'], 'delay': 0})
+        self.client.send_request_async('geterr', {'files': [projectFile], 'delay': 0})
+        run.start('a.ts')
+        self.assertTrue(self.done.wait(5))
+        time.sleep(0.2)
+        self.assertEqual(self.chunks, [(['b.ts'], 2, True)])
+
+    def test_deadline(self):
+        client = MagicMock()
+        client.getErrForProject = MagicMock(return_value=Future())
+        run = diagnostics.ProjectDiagnostics(client, self.on_chunk, deadline=0.1)
+        run.start('a.ts')
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.chunks, [([], 0, True)])
+        client.cancel.assert_called_once_with(run.future)
+
+    def test_cancelled(self):
+        run = diagnostics.ProjectDiagnostics(self.client, self.on_chunk)
+        run.cancel()
+        run.start('a.ts')
+        time.sleep(0.2)
+        self.assertEqual(self.chunks, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+sys.path.append('..')
+import os
+import shutil
+import tempfile
+import unittest
+from subprocess import check_call, DEVNULL
+from dir import Dir
+
+
+class TsDirTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        files = {
+            '.gitignore': 'dist/\n*.log\n# comment\n',
+            'index.ts': '',
+            'debug.log': '',
+            'dist/index.js': '',
+            'node_modules/lib/index.d.ts': '',
+            'src/a.ts': '',
+            'src/.gitignore': 'generated\n*.tmp\n!keep.tmp\n',
+            'src/generated/b.ts': '',
+            'src/c.tmp': '',
+            'src/keep.tmp': '',
+            'src/deep/d.ts': '',
+            'other/generated/e.ts': '',
+        }
+        for name, content in files.items():
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(content)
+        self.expected = ['.gitignore', 'index.ts',
+                         os.path.join('other', 'generated', 'e.ts'),
+                         os.path.join('src', '.gitignore'),
+                         os.path.join('src', 'a.ts'),
+                         os.path.join('src', 'deep', 'd.ts'),
+                         os.path.join('src', 'keep.tmp')]
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_nestedGitignore(self):
+        self.assertEqual(Dir(self.root, use_git=False).files(), self.expected)
+
+    def test_gitLsFiles(self):
+        try:
+            check_call(['git', 'init', '-q', self.root], stdout=DEVNULL)
+        except Exception:
+            self.skipTest('git is not available')
+        directory = Dir(self.root)
+        self.assertTrue(directory.git)
+        self.assertEqual(directory.files(), self.expected)
+        # tracked, then deleted without being staged
+        check_call(['git', 'add', 'src/a.ts'], cwd=self.root)
+        os.remove(os.path.join(self.root, 'src', 'a.ts'))
+        self.assertEqual(Dir(self.root).files(),
+                         [f for f in self.expected if f != os.path.join('src', 'a.ts')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import sys
+sys.path.append('..')
+import unittest
+import fuzzy
+from fuzzy import FuzzyIndex
+
+
+def symbol(name, file='a.ts', line=1):
+    return {'name': name, 'file': file, 'kind': 'class',
+            'start': {'line': line, 'offset': 1}}
+
+
+class TsFuzzyScoreTests(unittest.TestCase):
+    def test_noMatch(self):
+        self.assertIsNone(fuzzy.fuzzy_score('fbz', 'FooBar'))
+
+    def test_wordStartsRankHigher(self):
+        self.assertGreater(fuzzy.fuzzy_score('fb', 'FooBar'),
+                           fuzzy.fuzzy_score('fb', 'afoobar'))
+
+    def test_fallsBackToAnyOccurrence(self):
+        # taking the B word start for 'b' would leave nothing for 'x'
+        self.assertIsNotNone(fuzzy.fuzzy_score('bx', 'abxB'))
+
+
+class TsFuzzyIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = FuzzyIndex([
+            symbol('FooBar'), symbol('fooBarBaz', 'b.ts'), symbol('Barrier'),
+            symbol('FileBrowser', 'b.ts'), symbol('Unrelated')])
+
+    def test_ranking(self):
+        self.assertEqual([s['name'] for s in self.index.search('foobar')],
+                         ['FooBar', 'fooBarBaz'])
+        self.assertEqual([s['name'] for s in self.index.search('fb')],
+                         ['FooBar', 'fooBarBaz', 'FileBrowser'])
+
+    def test_limitKeepsSubstringMatches(self):
+        self.assertEqual([s['name'] for s in self.index.search('bar', 2)],
+                         ['Barrier', 'FooBar'])
+
+    def test_incrementalUpdates(self):
+        self.index.add([symbol('FooBar')])
+        self.assertEqual(len(self.index), 5)
+        self.index.replace_file('b.ts', [symbol('FooBaz', 'b.ts')])
+        self.assertEqual([s['name'] for s in self.index.search('fooba')],
+                         ['FooBar', 'FooBaz'])
@@ -0,0 +1,39 @@
+import sys
+sys.path.append('..')
+import unittest
+from globster import Globster, CompiledGlobster, ExceptionGlobster, TreeMatcher
+
+PATTERNS = ['*.log', '*.tar.gz', 'node_modules', '/dist', 'build/', 'src/gen/*.ts',
+            '**/coverage', '*.min.*', '.env.[a-z]*', 'a+b/c', 'RE:.*\\.bak$']
+
+PATHS = ['a.log', 'src/a.log', 'a.log.txt', 'x.tar.gz', 'node_modules',
+         'lib/node_modules', 'node_modules.ts', 'dist', 'src/dist', 'build',
+         'src/build', 'src/gen/a.ts', 'src/gen/deep/a.ts', 'lib/src/gen/a.ts',
+         'coverage', 'src/coverage', 'app.min.js', 'app.js', '.env.local',
+         '.env', 'a+b/c', 'aab/c', 'x.bak', 'src/x.bak', 'README.md']
+
+
+class TsGlobsterTests(unittest.TestCase):
+    def test_compiledMatchesLikeGlobster(self):
+        globster = Globster(PATTERNS)
+        compiled = CompiledGlobster(PATTERNS)
+        for path in PATHS:
+            self.assertEqual(compiled.match(path) is None,
+                             globster.match(path) is None, path)
+
+    def test_exceptions(self):
+        globster = ExceptionGlobster(['*.ts', '!keep.ts', '!!gen/keep.ts'], False)
+        self.assertTrue(globster.match('a.ts'))
+        self.assertIsNone(globster.match('keep.ts'))
+        self.assertTrue(globster.match('gen/keep.ts'))
+
+    def test_ignoredDirectoryPrunesItsSubtree(self):
+        matcher = TreeMatcher(CompiledGlobster(['dist', '*.log']))
+        self.assertTrue(matcher.match('dist/a/b/c.ts'))
+        self.assertTrue(matcher.match_dir('dist/a'))
+        self.assertTrue(matcher.match('src/a.log'))
+        self.assertFalse(matcher.match('src/a.ts'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import sys
+sys.path.append('..')
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import project_root
+from project_root import ProjectRoots, read_config
+
+
+class TsProjectRootsTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = os.path.realpath(tempfile.mkdtemp())
+        self.module = os.path.join(self.dir, 'packages', 'a', 'src')
+        os.makedirs(self.module)
+        self.write('tsconfig.json', '{}')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, path, text):
+        with open(os.path.join(self.dir, path), 'w') as f:
+            f.write(text)
+
+    def test_cachedLookup(self):
+        roots = ProjectRoots()
+        self.assertEqual(roots.root(self.module), self.dir)
+        with mock.patch('project_root.find_config') as find_config:
+            self.assertEqual(roots.root(self.module + '/'), self.dir)
+            find_config.assert_not_called()
+
+    def test_newConfigIsNoticed(self):
+        roots = ProjectRoots(interval=0)
+        self.assertEqual(roots.root(self.module), self.dir)
+        self.write('packages/a/jsconfig.json', '{}')
+        # directory mtimes may be coarse
+        os.utime(os.path.join(self.dir, 'packages', 'a'), (0, 0))
+        self.assertEqual(roots.root(self.module), os.path.join(self.dir, 'packages', 'a'))
+        os.remove(os.path.join(self.dir, 'packages', 'a', 'jsconfig.json'))
+        os.remove(os.path.join(self.dir, 'tsconfig.json'))
+        self.assertIsNone(roots.root(self.module))
+
+    def test_referencedProject(self):
+        self.write('packages/a/tsconfig.lib.json', '{}')
+        self.write('tsconfig.json', """{
+            // solution
+            "files": [],
+            "references": [
+                {"path": "./packages/a/tsconfig.lib.json"},
+                {"path": "./packages/b"},
+            ]
+        }""")
+        roots = ProjectRoots()
+        self.assertEqual(roots.root(self.module), os.path.join(self.dir, 'packages', 'a'))
+        self.assertEqual(roots.root(os.path.join(self.dir, 'packages')), self.dir)
+
+    def test_readConfig(self):
+        self.write('tsconfig.json', '{"include": ["src/**/*.ts"], /* a */ "x": 1,}')
+        self.assertEqual(read_config(os.path.join(self.dir, 'tsconfig.json')),
+                         {'include': ['src/**/*.ts'], 'x': 1})
@@ -0,0 +1,47 @@
+import sys
+sys.path.append('..')
+import os
+import unittest
+import tempfile
+import rename
+
+
+def loc(line, offset, length, endLine=None):
+    return {'start': {'line': line, 'offset': offset},
+            'end': {'line': endLine or line, 'offset': offset + length}}
+
+
+class TsRenameTests(unittest.TestCase):
+    def test_editsByFile(self):
+        locs = [{'file': 'a.ts', 'locs': [loc(1, 7, 3)]},
+                {'file': 'b.ts', 'locs': [loc(2, 10, 3), loc(4, 1, 3)]}]
+        edits = rename.edits_by_file(locs, 'bar')
+        self.assertEqual(sorted(edits), ['a.ts', 'b.ts'])
+        self.assertEqual(edits['a.ts'], [((1, 7), (1, 10), 'bar')])
+
+    def test_applyEditsInReverse(self):
+        lines = ['// header', 'const foo = foo + 1;', 'foo();', '// footer']
+        edits = [((2, 7), (2, 10), 'longer'), ((2, 13), (2, 16), 'longer'),
+                 ((3, 1), (3, 4), 'longer')]
+        self.assertEqual(rename.apply_edits(lines, edits), (1, 3, [
+            'const longer = longer + 1;', 'longer();']))
+        self.assertEqual(lines[1], 'const foo = foo + 1;')
+
+    def test_utf16Offsets(self):
+        lines = ['let s = "\U0001F600"; foo;']
+        # the emoji counts for two UTF-16 code units
+        self.assertEqual(rename.apply_edits(lines, [((1, 15), (1, 18), 'x')]),
+                         (0, 1, ['let s = "\U0001F600"; x;']))
+
+    def test_renameOnDisk(self):
+        fd, path = tempfile.mkstemp(suffix='.ts')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'import { foo } from "./foo";\r\nfoo();\r\n')
+        try:
+            rename.rename_on_disk(path, [((1, 10), (1, 13), 'bar'),
+                                         ((2, 1), (2, 4), 'bar')])
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(),
+                                 b'import { bar } from "./foo";\r\nbar();\r\n')
+        finally:
+            os.remove(path)
@@ -0,0 +1,112 @@
+import sys
+sys.path.append('..')
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from symbol_index import SymbolIndex, navtree_symbols, merge_dependencies
+
+
+def item(text, kind, line, kindModifiers='', childItems=None):
+    span = {'start': {'line': line, 'offset': 1},
+            'end': {'line': line, 'offset': 10}}
+    return {'text': text, 'kind': kind, 'kindModifiers': kindModifiers,
+            'spans': [span], 'childItems': childItems or []}
+
+
+NAVTREE = item('"a"', 'module', 1, childItems=[
+    item('Foo', 'class', 1, 'export', [item('bar', 'method', 2)]),
+    item('helper', 'function', 5),
+    item('FooBar', 'interface', 8, 'export'),
+    item('NS', 'module', 10, 'export,declare', [item('inner', 'function', 11, 'export')])])
+
+
+class TsSymbolIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'a.ts')
+        with open(self.file, 'w') as f:
+            f.write('export class Foo {}')
+        self.client = MagicMock()
+        self.client.getDocumentSymbols = MagicMock(return_value=NAVTREE)
+        self.client.projectInfo = MagicMock(
+            return_value={'fileNames': [self.file]})
+        self.index = SymbolIndex(os.path.join(self.dir, 'cache', 'index.sqlite'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.dir)
+
+    def test_navtreeSymbols(self):
+        self.assertEqual([s[:4] for s in navtree_symbols(NAVTREE)], [
+            ('Foo', 'class', 'export', ''), ('FooBar', 'interface', 'export', ''),
+            ('NS', 'module', 'export,declare', ''), ('inner', 'function', 'export', 'NS')])
+
+    def test_buildAndLookup(self):
+        self.assertFalse(self.index.ready())
+        self.index.build(self.client, self.file).join()
+        self.assertTrue(self.index.ready())
+        found = self.index.lookup('Foo')
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0]['file'], self.file)
+        self.assertEqual(found[0]['kindModifiers'], 'export')
+        self.assertEqual(found[0]['matchKind'], 'exact')
+        self.assertEqual(self.index.lookup('foo'), [])
+        self.assertEqual([s['name'] for s in self.index.search('foo')],
+                         ['Foo', 'FooBar'])
+
+    def test_readyAfterAFullBuild(self):
+        # a file indexed on save isn't the whole project
+        self.index.refresh(self.client, self.file)
+        self.assertFalse(self.index.ready())
+        self.index.build(self.client, self.file).join()
+        self.assertTrue(self.index.ready())
+        # the next session can use it right away
+        again = SymbolIndex(self.index.path)
+        self.assertTrue(again.ready())
+        again.close()
+
+    def test_mergeDependencies(self):
+        navto = [{'name': 'Component', 'file': '/p/src/component.ts'},
+                 {'name': 'Component', 'file': '/p/node_modules/react/index.d.ts'}]
+        indexed = [{'name': 'Component', 'file': '/p/src/component.ts'}]
+        self.assertEqual(merge_dependencies(indexed, navto), indexed + navto[1:])
+        self.assertEqual(merge_dependencies(indexed, None), indexed)
+
+    def test_unchangedFilesAreSkipped(self):
+        self.index.refresh(self.client, self.file)
+        self.index.refresh(self.client, self.file)
+        # touched but identical
+        os.utime(self.file, (0, 0))
+        self.index.refresh(self.client, self.file)
+        self.assertEqual(self.client.getDocumentSymbols.call_count, 1)
+
+    def test_dependenciesAreSkipped(self):
+        dependency = os.path.join(self.dir, 'node_modules', 'lib', 'index.ts')
+        declarations = os.path.join(self.dir, 'types.d.ts')
+        os.makedirs(os.path.dirname(dependency))
+        for f in (dependency, declarations):
+            open(f, 'w').close()
+        self.client.projectInfo = MagicMock(return_value={
+            'fileNames': [self.file, dependency, declarations]})
+        self.index.build(self.client, self.file).join()
+        self.assertEqual(self.index.files(), [self.file])
+        self.assertEqual(self.client.getDocumentSymbols.call_count, 1)
+
+    def test_fuzzySearchFollowsUpdates(self):
+        self.index.refresh(self.client, self.file)
+        self.assertEqual([s['name'] for s in self.index.fuzzy_search('fb')],
+                         ['FooBar'])
+        self.index.update(self.file, 0, '', item('"a"', 'module', 1, childItems=[
+            item('FizzBuzz', 'class', 1, 'export')]))
+        self.assertEqual([s['name'] for s in self.index.fuzzy_search('fb')],
+                         ['FizzBuzz'])
+        self.index.remove([self.file])
+        self.assertEqual(self.index.fuzzy_search('fb'), [])
+
+    def test_removedFiles(self):
+        self.index.refresh(self.client, self.file)
+        self.client.projectInfo = MagicMock(return_value={'fileNames': []})
+        self.index.build(self.client, self.file).join()
+        self.assertFalse(self.index.ready())
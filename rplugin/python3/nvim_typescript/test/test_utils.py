@@ -17,6 +17,32 @@ def generateCandidatesTest(currentFile, symbol, expected, tsserverOutput):
         self.assertEqual(candidates, expected)
     return test
 
+class TsGetImportCandidatesIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.getWorkspaceSymbols = MagicMock(return_value=[
+            symbol('Component', '/p/src/component.ts'),
+            symbol('Component', '/p/node_modules/react/index.d.ts', 'declare')])
+        self.index = MagicMock()
+        self.index.lookup = MagicMock(return_value=[
+            symbol('Component', '/p/src/component.ts')])
+
+    def test_dependenciesStayCandidates(self):
+        self.index.ready = MagicMock(return_value=True)
+        self.assertEqual(
+            utils.getImportCandidates(self.client, '/p/src/a.ts', 'Component', self.index),
+            ['/p/src/component.ts', '/p/node_modules/react/index.d.ts'])
+
+    def test_indexNotReady(self):
+        self.index.ready = MagicMock(return_value=False)
+        utils.getImportCandidates(self.client, '/p/src/a.ts', 'Component', self.index)
+        self.index.lookup.assert_not_called()
+
+
+def symbol(name, file, kindModifiers='export'):
+    return {'name': name, 'file': file, 'matchKind': 'exact',
+            'kindModifiers': kindModifiers}
+
 # Generate utils.getImportCandidates tests
 for f in glob.glob('./testData/importCandidatesTests/*.json'):
     with open(f, 'r') as fd:
@@ -51,5 +77,27 @@ for test in relativeImportPathTests:
     test = generateImportPathTests(test[1], test[2], test[3])
     setattr(TSGetRelativeImportPathTests, test_name, test)
 
+class TsSettingsTests(unittest.TestCase):
+    def setUp(self):
+        self.vim = MagicMock()
+        self.vim.eval = MagicMock(return_value={
+            'nvim_typescript#kind_symbols': {'method': 'meth'},
+            'nvim_typescript#completion_mark': 'TS'
+        })
+        utils.getSettings(self.vim, reload=True)
+
+    def test_singleRead(self):
+        self.assertEqual(utils.getKind(self.vim, 'method'), 'meth')
+        self.assertEqual(utils.getKind(self.vim, 'unknown'), 'unknown')
+        entry = {'name': 'foo', 'kind': 'method', 'displayParts': [{'text': '(method) foo(): void'}]}
+        self.assertEqual(utils.convert_detailed_completion_data(entry, self.vim)['menu'], 'TS foo(): void')
+        self.assertEqual(self.vim.eval.call_count, 1)
+
+    def test_reload(self):
+        self.vim.eval.return_value = {'nvim_typescript#kind_symbols': {}}
+        utils.getSettings(self.vim, reload=True)
+        self.assertEqual(utils.getKind(self.vim, 'method'), 'method')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,11 @@
 import os
 import re
+from symbol_index import merge_dependencies
 
 # Import function
 
 
-def getImportCandidates(client, currentFile, symbol):
+def getImportCandidates(client, currentFile, symbol, index=None):
     """
     Used by the :TSImport command to find files where the given symbol
     is defined.
@@ -12,9 +13,16 @@ def getImportCandidates(client, currentFile, symbol):
     :param client: an instance of the nvim-typescript tsserver client
     :param currentFile: the file currently focused in vim
     :param symbol: the symbol we're trying to import
+    :param index: the SymbolIndex of the project, used for the project
+                  files once it is ready
     :returns: a list of absolute file paths in which the symbol is defined
     """
-    matchingSymbols = client.getWorkspaceSymbols(currentFile, symbol)
+    matchingSymbols = client.getWorkspaceSymbols(currentFile, symbol,
+                                                  origin='TSImport')
+    if index is not None and index.ready():
+        # dependencies and declaration files aren't indexed
+        matchingSymbols = merge_dependencies(index.lookup(symbol),
+                                             matchingSymbols)
 
     def filterSymbols(x):
         return x['matchKind'] == "exact" and \
@@ -121,46 +129,101 @@ def getParams(members, separator):
     return ret
 
 
+# Settings
+
+_settings = None
+
+
+def getSettings(vim, reload=False):
+    """
+    Snapshot of all the g:nvim_typescript#* variables, without the prefix.
+    Read with a single call the first time, then only on reload
+    (:TSReloadConfig, or the dict watcher on g: set by the plugin).
+
+    :param vim: the neovim instance
+    :param reload: read the variables again
+    :returns: a dict of setting name to value
+    """
+    global _settings
+    if _settings is None or reload:
+        variables = vim.eval(
+            "filter(copy(g:), 'v:key =~# \"^nvim_typescript#\"')")
+        _settings = dict((key[len("nvim_typescript#"):], value)
+                         for key, value in variables.items())
+    return _settings
+
+
+def getSetting(vim, name, default=None):
+    """
+    Value of g:nvim_typescript#{name} from the settings snapshot
+    """
+    return getSettings(vim).get(name, default)
+
+
 def getKind(vim, kind):
-    if kind in vim.vars["nvim_typescript#kind_symbols"].keys():
-        return vim.vars["nvim_typescript#kind_symbols"][kind]
-    else:
-        return kind
+    return getSetting(vim, "kind_symbols", {}).get(kind, kind)
+
+
+# needed to strip new lines and indentation from the signature
+_whitespace = re.compile(r"\s+")
+_declaration_keyword = re.compile(
+    r"^(?:var|let|const|class|\(method\)|\(property\)|enum|namespace|function|import|interface|type)\s+")
+
+
+def iter_completion_response(entries, vim, detailed=False, isDeoplete=False):
+    """
+    Convert the entries of a completions response, or of a
+    completionEntryDetails response when detailed, into completion items.
+    Settings are read once for the whole batch and items are produced one
+    at a time, so the caller can stop early.
+
+    :param entries: the response body
+    :param vim: the neovim instance
+    :param detailed: entries come from completionEntryDetails
+    :param isDeoplete: leave out the completion mark from the menu
+    """
+    kinds = getSetting(vim, "kind_symbols", {})
+    mark = "" if isDeoplete else getSetting(vim, "completion_mark") + " "
+    labels = {}
+    for entry in entries:
+        kind = entry["kind"]
+        label = labels.get(kind)
+        if label is None:
+            label = labels[kind] = kinds.get(kind, kind)[0].title()
+
+        if not detailed:
+            yield {
+                "word": entry["name"],
+                "kind": label
+            }
+            continue
+
+        signature = _whitespace.sub(
+            " ", "".join([p["text"] for p in entry["displayParts"]]))
+        menu_text = _declaration_keyword.sub("", signature, 1)
+        documentation = menu_text
+        if entry.get("documentation"):
+            documentation += "\n" + \
+                "".join([d["text"] for d in entry["documentation"]])
+
+        yield {
+            "word": entry["name"],
+            "kind": label + " ",
+            "menu": mark + menu_text,
+            "info": documentation
+        }
+
+
+def convert_completion_response(entries, vim, detailed=False, isDeoplete=False):
+    """
+    List form of iter_completion_response
+    """
+    return list(iter_completion_response(entries, vim, detailed, isDeoplete))
 
 
 def convert_completion_data(entry, vim):
-    kind = getKind(vim, entry['kind'])[0].title()
-    return {
-        "word": entry["name"],
-        "kind": kind
-    }
+    return convert_completion_response([entry], vim)[0]
 
 
 def convert_detailed_completion_data(entry, vim, isDeoplete=False):
-    name = entry["name"]
-    display_parts = entry["displayParts"]
-    signature = "".join([p["text"] for p in display_parts])
-
-    # needed to strip new lines and indentation from the signature
-    signature = re.sub("\s+", " ", signature)
-    menu_text = re.sub(
-        "^(var|let|const|class|\(method\)|\(property\)|enum|namespace|function|import|interface|type)\s+", "", signature)
-    documentation = menu_text
-
-    if "documentation" in entry and entry["documentation"]:
-        documentation += "\n" + \
-            "".join([d["text"] for d in entry["documentation"]])
-
-    kind = getKind(vim, entry['kind'])[0].title()
-    if isDeoplete:
-        menu = menu_text
-    else:
-        menu = '{0} {1}'.format(
-            vim.vars['nvim_typescript#completion_mark'], menu_text)
-
-    return ({
-        "word": name,
-        "kind": '{} '.format(kind),
-        "menu": menu,
-        "info": documentation
-    })
+    return convert_completion_response([entry], vim, True, isDeoplete)[0]